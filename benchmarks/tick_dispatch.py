@@ -0,0 +1,81 @@
+"""
+    Microbenchmark of the tick callback dispatch of the CountdownTimerContext.
+
+    Compares the compiled callback tuples with the previous dispatch that walked a reversed SortedList of
+    PriorityCallback objects ordered by their __lt__, and the cost of the dispatch while the callback latencies are
+    recorded. Run from the repository root:
+
+        python benchmarks/tick_dispatch.py
+"""
+import os
+import sys
+import timeit
+
+from sortedcontainers import SortedList
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "main", "python"))
+
+from application.app import PriorityCallback  # noqa: E402
+from application.diagnostics import CallbackProfiler  # noqa: E402
+from application.timer import CountdownTimerContext, WSTCountdownTimerIdentifier  # noqa: E402
+
+TICKS = 100000
+CALLBACK_COUNTS = (2, 6, 20)
+
+
+class _SortedPriorityCallback(PriorityCallback):
+    # ordering of the previous implementation
+    def __lt__(self, other):
+        if self.priority == other.priority:
+            return hash(self.callback) < hash(other.callback)
+        return self.priority < other.priority
+
+
+class _Listener:
+    def on_tick(self, context):
+        pass
+
+
+def _sorted_list_dispatch(callback_count: int):
+    callbacks = SortedList(_SortedPriorityCallback(_Listener().on_tick, i % 5) for i in range(callback_count))
+    context = CountdownTimerContext()
+
+    def dispatch():
+        for priority_callback in reversed(callbacks):
+            priority_callback(context)
+
+    return dispatch
+
+
+def _table_dispatch(callback_count: int, profiled: bool = False):
+    context = CountdownTimerContext()
+    CallbackProfiler([context], enabled=profiled)
+    # the table only references the methods weakly, the dispatch closure keeps the listeners alive
+    listeners = [_Listener() for _ in range(callback_count)]
+    for i, listener in enumerate(listeners):
+        context.push_tick_identifier_callback(WSTCountdownTimerIdentifier.WORK,
+                                              PriorityCallback(listener.on_tick, i % 5))
+
+    def dispatch():
+        context.execute_tick_callbacks(WSTCountdownTimerIdentifier.WORK)
+
+    dispatch.listeners = listeners
+    return dispatch
+
+
+def main():
+    print(f"{'callbacks':>9} {'sorted list':>14} {'table':>14} {'speedup':>8} {'profiled':>14}")
+    for callback_count in CALLBACK_COUNTS:
+        sorted_list = _time(_sorted_list_dispatch(callback_count))
+        table = _time(_table_dispatch(callback_count))
+        profiled = _time(_table_dispatch(callback_count, profiled=True))
+        print(f"{callback_count:>9} {sorted_list * 1e9:>11.0f} ns {table * 1e9:>11.0f} ns {sorted_list / table:>7.1f}x "
+              f"{profiled * 1e9:>11.0f} ns")
+
+
+def _time(dispatch) -> float:
+    return min(timeit.repeat(dispatch, number=TICKS, repeat=5)) / TICKS
+
+
+if __name__ == "__main__":
+    main()
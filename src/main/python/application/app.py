@@ -1,9 +1,13 @@
+import weakref
 from enum import auto, Enum
-from typing import Callable, Dict, Optional
+from inspect import ismethod
+from itertools import count
+from time import perf_counter
+from types import MethodType
+from typing import Callable, Hashable, Optional, Tuple
 
-from sortedcontainers import SortedList
-
-from application.models import Task
+from application.diagnostics import CallbackProfiler
+from application.records import TaskRecord
 
 
 class PriorityCallback:
@@ -22,11 +26,6 @@ class PriorityCallback:
     def callback(self) -> Callable:
         return self._callback
 
-    def __lt__(self, other):
-        if self.priority == other.priority:
-            return hash(self._callback) < hash(other.callback)
-        return self.priority < other.priority
-
     def __call__(self, context):
         self.callback(context)
 
@@ -40,9 +39,121 @@ class PriorityCallback:
         return hash(self.callback)
 
 
-def execute_priority_callbacks(priority_callbacks: SortedList, context):
-    for priority_callback in reversed(priority_callbacks):
-        priority_callback(context)
+class CallbackHandle:
+    """
+        Registration of a callback in a PriorityCallbackTable as returned by push.
+        Removing a handle more than once or after its callback died does nothing.
+    """
+    __slots__ = ('_table', '_key', '_sequence')
+
+    def __init__(self, table: 'PriorityCallbackTable', key: Hashable, sequence: int):
+        self._table = table
+        self._key = key
+        self._sequence = sequence
+
+    def remove(self):
+        self._table.remove_registration(self._key, self._sequence)
+
+
+def _split(callback: Callable, on_dead: Callable) -> Tuple[Callable, Optional[weakref.ref]]:
+    if ismethod(callback):
+        return callback.__func__, weakref.ref(callback.__self__, on_dead)
+
+    # functions and other callables are owned by the table
+    return callback, None
+
+
+def _resolve(function: Callable, owner: Optional[weakref.ref]) -> Optional[Callable]:
+    if owner is None:
+        return function
+
+    instance = owner()
+    return None if instance is None else MethodType(function, instance)
+
+
+class PriorityCallbackTable:
+    """
+        Priority callbacks by key, e.g. by state.
+        The callbacks of a key are compiled into a tuple ordered by priority descending and, for equal priorities, by
+        the order they were pushed in. Push and remove rebuild the tuple of their key, so executing the callbacks only
+        iterates a tuple. Callbacks pushed or removed while the callbacks of a key are executed apply to the next call.
+        Bound methods are stored as their function and a weak reference to their object, the table never keeps e.g. a
+        closed window alive and the entries of an object are pruned once it is garbage collected.
+        While a profiler is set the wall time of every callback is recorded under the name of the table, the key and
+        the callback.
+    """
+    def __init__(self, name: str = ""):
+        self.profiler = None
+        self._name = name
+        # key -> list of (priority, sequence, function, weak reference to the object of a method or None)
+        self._entries = {}
+        # key -> tuple of (function, owner) in execution order and their profiler labels
+        self._tables = {}
+        self._labels = {}
+        self._sequence = count()
+
+    def push(self, key: Hashable, callback: PriorityCallback) -> CallbackHandle:
+        sequence = next(self._sequence)
+        function, owner = _split(callback.callback, lambda _: self._prune(key))
+        self._entries.setdefault(key, []).append((callback.priority, sequence, function, owner))
+        self._compile(key)
+        return CallbackHandle(self, key, sequence)
+
+    def remove(self, key: Hashable, callback: PriorityCallback):
+        for entry in self._entries.get(key, []):
+            if _resolve(entry[2], entry[3]) == callback.callback:
+                self.remove_registration(key, entry[1])
+                return
+
+        raise ValueError(f"{callback.callback} is not a callback of {key}")
+
+    def remove_registration(self, key: Hashable, sequence: int):
+        entries = self._entries.get(key, [])
+        for index, entry in enumerate(entries):
+            if entry[1] == sequence:
+                del entries[index]
+                self._compile(key)
+                return
+
+    def callbacks(self, key: Hashable) -> Tuple[Callable, ...]:
+        callbacks = (_resolve(function, owner) for function, owner in self._tables.get(key, ()))
+        return tuple(callback for callback in callbacks if callback is not None)
+
+    def execute(self, key: Hashable, context):
+        if self.profiler is not None:
+            self._execute_profiled(key, context)
+            return
+
+        for function, owner in self._tables.get(key, ()):
+            if owner is None:
+                function(context)
+                continue
+
+            instance = owner()
+            if instance is not None:
+                function(instance, context)
+
+    def _execute_profiled(self, key: Hashable, context):
+        for (function, owner), label in zip(self._tables.get(key, ()), self._labels.get(key, ())):
+            callback = _resolve(function, owner)
+            if callback is None:
+                continue
+            start = perf_counter()
+            callback(context)
+            self.profiler.record(label, int((perf_counter() - start) * 1000000))
+
+    def _prune(self, key: Hashable):
+        # called by the garbage collector, drops the entries of the objects that died
+        entries = self._entries.get(key, [])
+        entries[:] = [entry for entry in entries if entry[3] is None or entry[3]() is not None]
+        self._compile(key)
+
+    def _compile(self, key: Hashable):
+        entries = sorted(self._entries[key], key=lambda entry: (-entry[0], entry[1]))
+        self._tables[key] = tuple((entry[2], entry[3]) for entry in entries)
+        self._labels[key] = tuple(f"{self._name} {getattr(key, 'name', key)}: "
+                                  f"{getattr(entry[2], '__qualname__', repr(entry[2]))}"
+                                  for entry in entries)
 
 
 class IllegalWorkSplitTrackerStateException(Exception):
@@ -66,16 +177,17 @@ class WSTContext:
         self.stop_time = None
         self.work_time = None
         self.break_time = None
-        self._before_state_change_callbacks = {}
-        self._after_state_change_callbacks = {}
+        self._before_state_change_callbacks = PriorityCallbackTable("before")
+        self._after_state_change_callbacks = PriorityCallbackTable("after")
 
-    @staticmethod
-    def _push_state_change_callback(state_callback_dict: Dict[WSTState, SortedList],
-                                    state: WSTState, callback: PriorityCallback):
-        if state not in state_callback_dict:
-            state_callback_dict[state] = SortedList()
+    @property
+    def profiler(self) -> Optional[CallbackProfiler]:
+        return self._after_state_change_callbacks.profiler
 
-        state_callback_dict[state].add(callback)
+    @profiler.setter
+    def profiler(self, profiler: Optional[CallbackProfiler]):
+        self._before_state_change_callbacks.profiler = profiler
+        self._after_state_change_callbacks.profiler = profiler
 
     def change_state(self, new_state: WSTState):
         if self.state == new_state:
@@ -86,28 +198,22 @@ class WSTContext:
         self._after_state_change()
 
     def _before_state_change(self):
-        priority_callback_list = self._before_state_change_callbacks.get(self.state)
-
-        if priority_callback_list:
-            execute_priority_callbacks(priority_callback_list, self)
+        self._before_state_change_callbacks.execute(self.state, self)
 
     def _after_state_change(self):
-        priority_callback_list = self._after_state_change_callbacks.get(self.state)
-
-        if priority_callback_list:
-            execute_priority_callbacks(priority_callback_list, self)
+        self._after_state_change_callbacks.execute(self.state, self)
 
-    def push_before_state_change_callback(self, state: WSTState, callback: PriorityCallback):
-        self._push_state_change_callback(self._before_state_change_callbacks, state, callback)
+    def push_before_state_change_callback(self, state: WSTState, callback: PriorityCallback) -> CallbackHandle:
+        return self._before_state_change_callbacks.push(state, callback)
 
     def remove_before_state_change_callback(self, state: WSTState, callback: PriorityCallback):
-        self._before_state_change_callbacks[state].remove(callback)
+        self._before_state_change_callbacks.remove(state, callback)
 
-    def push_after_state_change_callback(self, state: WSTState, callback: PriorityCallback):
-        self._push_state_change_callback(self._after_state_change_callbacks, state, callback)
+    def push_after_state_change_callback(self, state: WSTState, callback: PriorityCallback) -> CallbackHandle:
+        return self._after_state_change_callbacks.push(state, callback)
 
     def remove_after_state_change_callback(self, state: WSTState, callback: PriorityCallback):
-        self._after_state_change_callbacks[state].remove(callback)
+        self._after_state_change_callbacks.remove(state, callback)
 
 
 class WorkSplitTracker:
@@ -121,7 +227,7 @@ class WorkSplitTracker:
     def context(self) -> WSTContext:
         return self._context
 
-    def do_work(self, task: Optional[Task]):
+    def do_work(self, task: Optional[TaskRecord]):
         self._context.task = task
         self._context.change_state(WSTState.WORK)
 
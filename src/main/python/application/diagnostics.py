@@ -0,0 +1,172 @@
+import traceback
+from datetime import datetime
+from types import FrameType
+from typing import Dict, Iterable, List, Tuple
+
+# 16 linear sub-buckets per power of two, the bucket of a value is at most 1/16 smaller than the value
+_SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+
+
+def _bucket(value: int) -> int:
+    if value < _SUB_BUCKETS:
+        return value
+
+    exponent = value.bit_length() - _SUB_BUCKET_BITS - 1
+    return (exponent + 1) * _SUB_BUCKETS + (value >> exponent) - _SUB_BUCKETS
+
+
+def _bucket_value(bucket: int) -> int:
+    if bucket < _SUB_BUCKETS:
+        return bucket
+
+    exponent = bucket // _SUB_BUCKETS - 1
+    return (bucket % _SUB_BUCKETS + _SUB_BUCKETS) << exponent
+
+
+class LatencyHistogram:
+    """
+        HDR style histogram of latencies in microseconds.
+        Values are counted in log-linear buckets, so recording is O(1) and the memory grows with the logarithm of the
+        largest value. Percentiles are accurate to the bucket width of about 6%, count, total, min and max are exact.
+    """
+    def __init__(self):
+        self._counts = {}
+        self._count = 0
+        self._total = 0
+        self._min = None
+        self._max = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        return self._total / self._count if self._count else 0.0
+
+    @property
+    def min(self) -> int:
+        return self._min or 0
+
+    @property
+    def max(self) -> int:
+        return self._max
+
+    def record(self, microseconds: int):
+        bucket = _bucket(microseconds)
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self._count = self._count + 1
+        self._total = self._total + microseconds
+        if self._min is None or microseconds < self._min:
+            self._min = microseconds
+        if microseconds > self._max:
+            self._max = microseconds
+
+    def percentile(self, percent: float) -> int:
+        if not self._count:
+            return 0
+
+        rank = self._count * percent / 100
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen = seen + self._counts[bucket]
+            if seen >= rank:
+                return min(_bucket_value(bucket), self._max)
+
+        return self._max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self._count,
+            'mean_us': self.mean,
+            'min_us': self.min,
+            'p50_us': self.percentile(50),
+            'p90_us': self.percentile(90),
+            'p99_us': self.percentile(99),
+            'max_us': self._max,
+            'buckets': [[_bucket_value(bucket), self._counts[bucket]] for bucket in sorted(self._counts)]
+        }
+
+
+class CallbackProfiler:
+    """
+        Records the wall time of every state change, tick and alarm callback into a histogram per callback.
+        The profiler is attached to the callback tables of the contexts only while it is enabled, a disabled profiler
+        costs the dispatch a single None check.
+    """
+    def __init__(self, contexts: Iterable, enabled: bool = False):
+        # contexts with a profiler attribute, i.e. WSTContext and CountdownTimerContext
+        self._contexts = list(contexts)
+        self._histograms = {}
+        self._enabled = False
+        self.enabled = enabled
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool):
+        self._enabled = enabled
+        for context in self._contexts:
+            context.profiler = self if enabled else None
+
+    def record(self, label: str, microseconds: int):
+        histogram = self._histograms.get(label)
+        if histogram is None:
+            histogram = LatencyHistogram()
+            self._histograms[label] = histogram
+        histogram.record(microseconds)
+
+    def labels(self) -> List[str]:
+        return sorted(self._histograms)
+
+    def histogram(self, label: str) -> LatencyHistogram:
+        return self._histograms[label]
+
+    def clear(self):
+        self._histograms = {}
+
+    def to_dict(self) -> Dict[str, dict]:
+        return {label: self._histograms[label].to_dict() for label in self.labels()}
+
+
+def format_stack(frame: FrameType, exclude: Iterable[str] = ()) -> Tuple[str, ...]:
+    """
+        Stack of the frame, outermost call first, without the frames of files containing one of the exclude strings.
+        The source lines are not looked up, so this is cheap enough to call from a sampling thread.
+    """
+    summaries = traceback.StackSummary.extract(traceback.walk_stack(frame), lookup_lines=False)
+    return tuple(f"{summary.filename}:{summary.lineno} in {summary.name}" for summary in reversed(summaries)
+                 if not any(part in summary.filename for part in exclude))
+
+
+class Stall:
+    """
+        Time the event loop didn't process events, with the stacks sampled meanwhile, most frequent first
+    """
+    __slots__ = ('kind', 'started', 'duration', 'stacks')
+
+    STALL = "stall"
+    NESTED_LOOP = "nested event loop"
+
+    def __init__(self, kind: str, started: datetime, duration: int, stacks: List[Tuple[int, Tuple[str, ...]]]):
+        self.kind = kind
+        self.started = started
+        # milliseconds
+        self.duration = duration
+        # (samples, stack)
+        self.stacks = stacks
+
+    @property
+    def location(self) -> str:
+        return self.stacks[0][1][-1] if self.stacks and self.stacks[0][1] else ""
+
+    def to_dict(self) -> dict:
+        return {
+            'kind': self.kind,
+            'started': self.started.isoformat(),
+            'duration_ms': self.duration,
+            'stacks': [{'samples': samples, 'stack': list(stack)} for samples, stack in self.stacks]
+        }
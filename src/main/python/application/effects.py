@@ -0,0 +1,97 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class EffectExecutor:
+    """
+        Runs side effects like sounds and notifications on a small worker pool, so the timer callbacks on the GUI thread
+        never wait for audio or D-Bus.
+        At most one effect per key is in flight, another one submitted meanwhile is dropped. An effect submitted with
+        submit_process runs in a spawned child process that is killed after the timeout, so it holds its worker at
+        most that long. Threads can't be interrupted, an effect submitted with submit running longer than the timeout
+        is logged and no longer blocks its key, but keeps its worker. Exceptions are logged and never reach the caller.
+    """
+    def __init__(self, max_workers: int = 2, timeout: float = 10.0):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="effect")
+        # a forked child would inherit the state of Qt and the audio libraries of this multithreaded process
+        self._process_context = multiprocessing.get_context("spawn")
+        self._timeout = timeout
+        # key -> future of the running effect and the time it was submitted
+        self._in_flight = {}
+        # child processes of the running effects, started by the workers and killed on shutdown
+        self._processes = set()
+        self._processes_lock = threading.Lock()
+        self._shut_down = False
+
+    def submit(self, key: Hashable, effect: Callable, *args, **kwargs) -> bool:
+        return self._submit(key, self._run, key, effect, args, kwargs)
+
+    def submit_process(self, key: Hashable, effect: Callable, *args, **kwargs) -> bool:
+        """
+            Runs the effect in a child process, the effect and its arguments have to be picklable, e.g. a module level
+            function
+        """
+        return self._submit(key, self._run_process, key, effect, args, kwargs)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        with self._processes_lock:
+            self._shut_down = True
+            processes = list(self._processes)
+        for process in processes:
+            process.terminate()
+
+    def _submit(self, key: Hashable, function: Callable, *args) -> bool:
+        running = self._in_flight.get(key)
+        if running is not None and not running[0].done():
+            elapsed = time.monotonic() - running[1]
+            if elapsed < self._timeout:
+                logger.debug("effect %s still running, dropped", key)
+                return False
+            logger.warning("effect %s still running after %.1fs, no longer waiting for it", key, elapsed)
+
+        try:
+            future = self._executor.submit(function, *args)
+        except RuntimeError:
+            # the executor was shut down while the application quits
+            return False
+
+        self._in_flight[key] = (future, time.monotonic())
+        return True
+
+    @staticmethod
+    def _run(key: Hashable, effect: Callable, args: tuple, kwargs: dict):
+        try:
+            effect(*args, **kwargs)
+        except Exception:
+            logger.exception("effect %s failed", key)
+
+    def _run_process(self, key: Hashable, effect: Callable, args: tuple, kwargs: dict):
+        with self._processes_lock:
+            if self._shut_down:
+                return
+            try:
+                process = self._process_context.Process(target=effect, args=args, kwargs=kwargs,
+                                                        name=f"effect-{key}", daemon=True)
+                process.start()
+            except Exception:
+                logger.exception("effect %s failed to start", key)
+                return
+            self._processes.add(process)
+
+        process.join(self._timeout)
+        if process.is_alive():
+            logger.warning("effect %s still running after %.1fs, killed", key, self._timeout)
+            process.terminate()
+            process.join()
+        elif process.exitcode and not self._shut_down:
+            logger.error("effect %s failed with exit code %d", key, process.exitcode)
+
+        with self._processes_lock:
+            self._processes.discard(process)
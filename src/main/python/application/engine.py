@@ -0,0 +1,48 @@
+from typing import Callable, Optional
+
+from application.app import WorkSplitTracker, WSTContext
+from application.notification import Notifier
+from application.settings import SettingsNotifier
+from application.sound import SoundPlayer
+from application.timer import AsyncioTimer, CountdownTimerContext, CountdownTimerController, Timer
+from db import SettingsRepository
+
+
+class Engine:
+    """
+        Core of the tracker: the work split tracker, its countdown timers and the settings, without any GUI.
+        The timer factory decides the event loop the timers run on, e.g. QTimerAdapter for the tray app or AsyncioTimer
+        to run headless. Without a notifier or sound player the alarms are silent.
+    """
+    def __init__(self, settings_repository: SettingsRepository, timer_factory: Callable[[], Timer] = AsyncioTimer,
+                 notifier: Optional[Notifier] = None, sound_player: Optional[SoundPlayer] = None):
+        self._settings_notifier = SettingsNotifier(settings_repository)
+        self._wst_context = WSTContext()
+        self._timer_context = CountdownTimerContext()
+        self._wst_timer_controller = CountdownTimerController(wst_context=self._wst_context,
+                                                              timer_context=self._timer_context,
+                                                              settings_notifier=self._settings_notifier,
+                                                              timer_factory=timer_factory,
+                                                              notifier=notifier,
+                                                              sound_player=sound_player)
+        self._wst = WorkSplitTracker(self._wst_context)
+
+    @property
+    def settings_notifier(self) -> SettingsNotifier:
+        return self._settings_notifier
+
+    @property
+    def wst_context(self) -> WSTContext:
+        return self._wst_context
+
+    @property
+    def timer_context(self) -> CountdownTimerContext:
+        return self._timer_context
+
+    @property
+    def wst_timer_controller(self) -> CountdownTimerController:
+        return self._wst_timer_controller
+
+    @property
+    def wst(self) -> WorkSplitTracker:
+        return self._wst
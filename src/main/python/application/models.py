@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
 from sqlalchemy.orm import declarative_base, relationship
@@ -29,7 +30,7 @@ class Activity(Base):
     __abstract__ = True
 
     id = Column(Integer, primary_key=True)
-    date = Column(DateTime)
+    date = Column(DateTime, index=True)
     duration = Column(Integer)
     expected_duration = Column(Integer)
 
@@ -40,15 +41,12 @@ class Activity(Base):
 
 class WorkActivity(Activity):
     __tablename__ = "work-activity"
-    task_id = Column(Integer, ForeignKey(Task.id))
+    task_id = Column(Integer, ForeignKey(Task.id), index=True)
     task_reference = relationship("Task", back_populates="activities")
 
-    def __init__(self, date: datetime, expected_duration: int, work_item: Task):
+    def __init__(self, date: datetime, expected_duration: int, task_id: Optional[int]):
         super(WorkActivity, self).__init__(date, expected_duration)
-
-        if work_item:
-            self.task_id = work_item.id
-            self.task_reference = work_item
+        self.task_id = task_id
 
 
 class BreakActivity(Activity):
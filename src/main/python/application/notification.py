@@ -0,0 +1,38 @@
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from application.effects import EffectExecutor
+
+
+def _notify(**kwargs):
+    # runs in the child process of the effect executor, plyer's notification facade can't be pickled
+    from plyer import notification
+
+    notification.notify(**kwargs)
+
+
+class Notifier(ABC):
+    """Shows desktop notifications, without blocking the caller."""
+
+    @abstractmethod
+    def notify(self, title: str, message: str):
+        raise NotImplementedError
+
+
+class PlyerNotifier(Notifier):
+    """
+        Shows notifications with plyer in a child process of the effect executor, at most one at a time.
+        image_path resolves the file name of a bundled image to its path.
+    """
+    def __init__(self, effect_executor: EffectExecutor, image_path: Callable[[str], str],
+                 app_name: str = "Work Split Tracker"):
+        # imported here, the engine uses the Notifier interface without plyer being installed
+        from plyer.utils import platform
+
+        self._effect_executor = effect_executor
+        self._app_name = app_name
+        self._app_icon = image_path("211694_bell_icon" + (".ico" if platform == "win" else ".png"))
+
+    def notify(self, title: str, message: str):
+        self._effect_executor.submit_process("notification", _notify, title=title, message=message,
+                                             app_name=self._app_name, app_icon=self._app_icon)
@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Optional
+
+
+class TaskRecord:
+    """
+        Detached task as returned by the TaskRepository.
+        Uses __slots__ so holding thousands of tasks costs no more than the attributes themselves.
+    """
+    __slots__ = ('id', 'name', 'priority', 'completed_workload', 'total_workload', 'completed', 'tracked_seconds',
+                 'session_count')
+
+    def __init__(self, name: str, priority: int, completed_workload: int, total_workload: int,
+                 completed: bool = False, id: Optional[int] = None, tracked_seconds: int = 0, session_count: int = 0):
+        self.id = id
+        self.name = name
+        self.priority = priority
+        self.completed_workload = completed_workload
+        self.total_workload = total_workload
+        self.completed = completed
+        self.tracked_seconds = tracked_seconds
+        self.session_count = session_count
+
+
+class ActivityRecord:
+    """
+        Detached activity as returned by the WorkBreakActivityRepository
+    """
+    __slots__ = ('id', 'date', 'duration', 'expected_duration')
+
+    def __init__(self, date: datetime, expected_duration: int, duration: Optional[int] = None,
+                 id: Optional[int] = None):
+        self.id = id
+        self.date = date
+        self.duration = duration
+        self.expected_duration = expected_duration
+
+
+class WorkActivityRecord(ActivityRecord):
+    __slots__ = ('task_id',)
+
+    def __init__(self, date: datetime, expected_duration: int, task_id: Optional[int] = None,
+                 duration: Optional[int] = None, id: Optional[int] = None):
+        super(WorkActivityRecord, self).__init__(date, expected_duration, duration, id)
+        self.task_id = task_id
+
+
+class BreakActivityRecord(ActivityRecord):
+    __slots__ = ()
+
+
+class SettingsRecord:
+    """
+        Detached settings as returned by the SettingsRepository
+    """
+    __slots__ = ('id', 'work_time', 'break_time', 'play_sound', 'show_notification')
+
+    def __init__(self, id: int, work_time: int, break_time: int, play_sound: bool, show_notification: bool):
+        self.id = id
+        self.work_time = work_time
+        self.break_time = break_time
+        self.play_sound = play_sound
+        self.show_notification = show_notification
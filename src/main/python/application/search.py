@@ -0,0 +1,117 @@
+from collections import Counter
+from typing import Hashable, List, Set
+
+from sortedcontainers import SortedList
+
+# queries shorter than a trigram are answered from the sorted names and words only
+_TRIGRAM_LENGTH = 3
+_NAME_PREFIX = 0
+_WORD_PREFIX = 1
+_SUBSTRING = 2
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + _TRIGRAM_LENGTH] for i in range(len(text) - _TRIGRAM_LENGTH + 1)}
+
+
+class TextIndex:
+    """
+        In memory index that finds keys by a case insensitive query on their text.
+        Names and their words are kept sorted for prefix lookups, every text is additionally indexed by its trigrams
+        for substring and fuzzy matches. Matches are ranked by name prefix, word prefix and substring, texts that only
+        share some trigrams with the query come last.
+    """
+    def __init__(self):
+        self._texts = {}
+        self._names = SortedList()
+        self._words = SortedList()
+        # trigram -> keys of the texts containing it
+        self._trigrams = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._texts
+
+    def add(self, key: Hashable, text: str):
+        text = text.lower()
+        if self._texts.get(key) == text:
+            return
+        if key in self._texts:
+            self.remove(key)
+
+        self._texts[key] = text
+        self._names.add((text, key))
+        self._words.update((word, key) for word in set(text.split()))
+        for trigram in _trigrams(text):
+            self._trigrams.setdefault(trigram, set()).add(key)
+
+    def remove(self, key: Hashable):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+
+        self._names.remove((text, key))
+        for word in set(text.split()):
+            self._words.remove((word, key))
+        for trigram in _trigrams(text):
+            keys = self._trigrams[trigram]
+            keys.discard(key)
+            if not keys:
+                del self._trigrams[trigram]
+
+    def search(self, query: str, limit: int) -> List[Hashable]:
+        query = query.lower().strip()
+        if not query or limit <= 0:
+            return []
+
+        if len(query) < _TRIGRAM_LENGTH:
+            return self._search_prefix(query, limit)
+
+        matches = self._search_substring(query)
+        if matches:
+            return matches[:limit]
+
+        return self._search_similar(query, limit)
+
+    def _search_prefix(self, query: str, limit: int) -> List[Hashable]:
+        # both lists are sorted, so the matches are read in order and reading stops at the limit
+        matches = []
+        for sorted_texts in (self._names, self._words):
+            for text, key in sorted_texts.islice(sorted_texts.bisect_left((query,))):
+                if not text.startswith(query) or len(matches) == limit:
+                    break
+                if key not in matches:
+                    matches.append(key)
+
+        return matches
+
+    def _search_substring(self, query: str) -> List[Hashable]:
+        postings = sorted((self._trigrams.get(trigram, set()) for trigram in _trigrams(query)), key=len)
+        candidates = set.intersection(*postings) if postings[0] else set()
+
+        ranked = []
+        for key in candidates:
+            text = self._texts[key]
+            if text.startswith(query):
+                ranked.append((_NAME_PREFIX, text, key))
+            elif any(word.startswith(query) for word in text.split()):
+                ranked.append((_WORD_PREFIX, text, key))
+            elif query in text:
+                ranked.append((_SUBSTRING, text, key))
+
+        ranked.sort(key=lambda match: match[:2])
+        return [key for _, _, key in ranked]
+
+    def _search_similar(self, query: str, limit: int) -> List[Hashable]:
+        # tolerates typos: texts sharing at least half of the trigrams of the query, the most shared first
+        trigrams = _trigrams(query)
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+
+        minimum = max(len(trigrams) // 2, 1)
+        ranked = sorted((key for key, count in shared.items() if count >= minimum),
+                        key=lambda key: (-shared[key], self._texts[key]))
+        return ranked[:limit]
@@ -1,6 +1,6 @@
 from typing import Callable
 
-from application.models import Settings
+from application.records import SettingsRecord
 from db import SettingsRepository
 
 
@@ -57,5 +57,5 @@ class SettingsNotifier:
         for listener in self._change_listener:
             listener(self._settings)
 
-    def add_change_listener(self, listener: Callable[[Settings], None]):
+    def add_change_listener(self, listener: Callable[[SettingsRecord], None]):
         self._change_listener.append(listener)
@@ -0,0 +1,30 @@
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from application.effects import EffectExecutor
+
+
+class SoundPlayer(ABC):
+    """Plays the bundled sounds by their file name, without blocking the caller."""
+
+    @abstractmethod
+    def play(self, file_name: str):
+        raise NotImplementedError
+
+
+class PlaysoundPlayer(SoundPlayer):
+    """
+        Plays sounds with playsound in a child process of the effect executor, which is killed if playing hangs.
+        Every sound is opened and decoded again each time it is played.
+        sound_path resolves the file name of a bundled sound to its path.
+    """
+    def __init__(self, effect_executor: EffectExecutor, sound_path: Callable[[str], str]):
+        # imported here, the engine uses the SoundPlayer interface without playsound being installed
+        from playsound import playsound
+
+        self._playsound = playsound
+        self._effect_executor = effect_executor
+        self._sound_path = sound_path
+
+    def play(self, file_name: str):
+        self._effect_executor.submit_process("sound", self._playsound, self._sound_path(file_name))
@@ -1,17 +1,14 @@
+import asyncio
 from abc import ABC, abstractmethod
 from enum import auto, Enum
-from typing import Callable, Dict
+from typing import Callable, Optional
 
-from PyQt5.QtCore import QTimer
-from playsound import playsound
-from plyer import notification
-from plyer.utils import platform
-from sortedcontainers import SortedList
-
-import utils
-from application.app import execute_priority_callbacks, WSTContext, WSTState, PriorityCallback
-from application.models import Settings
+from application.app import CallbackHandle, PriorityCallback, PriorityCallbackTable, WSTContext, WSTState
+from application.diagnostics import CallbackProfiler
+from application.notification import Notifier
+from application.records import SettingsRecord
 from application.settings import SettingsNotifier
+from application.sound import SoundPlayer
 
 
 class Timer(ABC):
@@ -49,30 +46,40 @@ class Timer(ABC):
         raise NotImplementedError
 
 
-class QTimerAdapter(Timer):
+class AsyncioTimer(Timer):
     """
-        Timer implementation using the QTimer class provided by the PyQt framework
+        Timer implementation scheduling the task on an asyncio event loop, runs without Qt.
+        The ticks are scheduled relative to the start, so they don't drift by the time the task takes. After a stall of
+        the loop the missed ticks are skipped like QTimer does.
     """
-    def __init__(self, task: Callable[[], None] = lambda: None, interval: int = 1000):
-        super(QTimerAdapter, self).__init__(task, interval)
-        self._timer = QTimer()
-        self._timer.interval = self._interval
-
-    @Timer.task.setter
-    def task(self, task: Callable):
-        self._task = task
-        if not self._task:
-            self._timer.timeout.disconnect()
-        self._timer.timeout.connect(self.task)
+    def __init__(self, task: Callable[[], None] = lambda: None, interval: int = 1000,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        super(AsyncioTimer, self).__init__(task, interval)
+        self._loop = loop
+        self._handle = None
+        self._due = 0.0
 
     def start(self):
-        self._timer.start(self._interval)
+        loop = self._loop or asyncio.get_event_loop()
+        self._due = loop.time()
+        self._schedule(loop)
 
     def stop(self):
-        self._timer.stop()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
 
     def is_active(self) -> bool:
-        return self._timer.isActive()
+        return self._handle is not None
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        self._due = max(self._due + self._interval / 1000, loop.time())
+        self._handle = loop.call_at(self._due, self._tick, loop)
+
+    def _tick(self, loop: asyncio.AbstractEventLoop):
+        # rescheduled first, the task may stop the timer
+        self._schedule(loop)
+        self._task()
 
 
 class IllegalCountdownTimerStateException(Exception):
@@ -90,40 +97,37 @@ class CountdownTimerContext:
     """
     def __init__(self):
         self.seconds_left = 0
-        self._alarm_callbacks = {}
-        self._tick_callbacks = {}
+        self._alarm_callbacks = PriorityCallbackTable("alarm")
+        self._tick_callbacks = PriorityCallbackTable("tick")
 
-    @staticmethod
-    def _push_identifier_callback(state_callback_dict: Dict[WSTCountdownTimerIdentifier, SortedList],
-                                  identifier: WSTCountdownTimerIdentifier, callback: PriorityCallback):
-        if identifier not in state_callback_dict:
-            state_callback_dict[identifier] = SortedList()
+    @property
+    def profiler(self) -> Optional[CallbackProfiler]:
+        return self._tick_callbacks.profiler
 
-        state_callback_dict[identifier].add(callback)
+    @profiler.setter
+    def profiler(self, profiler: Optional[CallbackProfiler]):
+        self._alarm_callbacks.profiler = profiler
+        self._tick_callbacks.profiler = profiler
 
     def execute_alarm_callbacks(self, identifier: WSTCountdownTimerIdentifier):
-        priority_callback_list = self._alarm_callbacks.get(identifier)
-
-        if priority_callback_list:
-            execute_priority_callbacks(priority_callback_list, self)
+        self._alarm_callbacks.execute(identifier, self)
 
     def execute_tick_callbacks(self, identifier: WSTCountdownTimerIdentifier):
-        priority_callback_list = self._tick_callbacks.get(identifier)
-
-        if priority_callback_list:
-            execute_priority_callbacks(priority_callback_list, self)
+        self._tick_callbacks.execute(identifier, self)
 
-    def push_alarm_identifier_callback(self, identifier: WSTCountdownTimerIdentifier, callback: PriorityCallback):
-        self._push_identifier_callback(self._alarm_callbacks, identifier, callback)
+    def push_alarm_identifier_callback(self, identifier: WSTCountdownTimerIdentifier,
+                                       callback: PriorityCallback) -> CallbackHandle:
+        return self._alarm_callbacks.push(identifier, callback)
 
     def remove_alarm_identifier_callback(self, identifier: WSTCountdownTimerIdentifier, callback: PriorityCallback):
-        self._alarm_callbacks[identifier].remove(callback)
+        self._alarm_callbacks.remove(identifier, callback)
 
-    def push_tick_identifier_callback(self, identifier: WSTCountdownTimerIdentifier, callback: PriorityCallback):
-        self._push_identifier_callback(self._tick_callbacks, identifier, callback)
+    def push_tick_identifier_callback(self, identifier: WSTCountdownTimerIdentifier,
+                                      callback: PriorityCallback) -> CallbackHandle:
+        return self._tick_callbacks.push(identifier, callback)
 
     def remove_tick_identifier_callback(self, identifier: WSTCountdownTimerIdentifier, callback: PriorityCallback):
-        self._tick_callbacks[identifier].remove(callback)
+        self._tick_callbacks.remove(identifier, callback)
 
 
 class CountdownTimer:
@@ -192,21 +196,24 @@ class CountdownTimerController:
         Handles settings changes and configures the timer accordingly.
     """
     def __init__(self, wst_context: WSTContext, timer_context: CountdownTimerContext,
-                 settings_notifier: SettingsNotifier):
+                 settings_notifier: SettingsNotifier, timer_factory: Callable[[], Timer],
+                 notifier: Optional[Notifier] = None, sound_player: Optional[SoundPlayer] = None):
         self._app_context = wst_context
         self._countdown_timer_context = timer_context
+        self._notifier = notifier
+        self._sound_player = sound_player
         self._show_notification = settings_notifier.show_notification
         self._play_sound = settings_notifier.play_sound
         self._timer = {
             WSTCountdownTimerIdentifier.WORK: CountdownTimer(
                 identifier=WSTCountdownTimerIdentifier.WORK,
-                timer=QTimerAdapter(),
+                timer=timer_factory(),
                 context=self._countdown_timer_context,
                 seconds=settings_notifier.work_time * 60
             ),
             WSTCountdownTimerIdentifier.BREAK: CountdownTimer(
                 identifier=WSTCountdownTimerIdentifier.BREAK,
-                timer=QTimerAdapter(),
+                timer=timer_factory(),
                 context=self._countdown_timer_context,
                 seconds=settings_notifier.break_time * 60
             )
@@ -268,30 +275,25 @@ class CountdownTimerController:
     def _start_break_timer(self, context: WSTContext):
         self._timer[WSTCountdownTimerIdentifier.BREAK].start()
 
-    def _handle_work_time_change(self, settings: Settings):
+    def _handle_work_time_change(self, settings: SettingsRecord):
         self._timer[WSTCountdownTimerIdentifier.WORK].seconds = settings.work_time * 60
         self._app_context.work_time = settings.work_time
 
-    def _handle_break_time_change(self, settings: Settings):
+    def _handle_break_time_change(self, settings: SettingsRecord):
         self._timer[WSTCountdownTimerIdentifier.BREAK].seconds = settings.break_time * 60
         self._app_context.break_time = settings.break_time
 
-    def _handle_show_notification_change(self, settings: Settings):
+    def _handle_show_notification_change(self, settings: SettingsRecord):
         if settings.show_notification != self._show_notification:
             self._show_notification = settings.show_notification
 
-    def _handle_play_sound_change(self, settings: Settings):
+    def _handle_play_sound_change(self, settings: SettingsRecord):
         if settings.play_sound != self._play_sound:
             self._play_sound = settings.play_sound
 
     def _show_notification_callback(self, timer_type: str):
-        if self._show_notification:
-            notification.notify(
-                title="Alarm",
-                message=f"Your {timer_type} time is over!",
-                app_name="Work Split Tracker",
-                app_icon=utils.resource_provider.image("211694_bell_icon" + (".ico" if platform == "win" else ".png"))
-            )
+        if self._show_notification and self._notifier is not None:
+            self._notifier.notify(title="Alarm", message=f"Your {timer_type} time is over!")
 
     def _show_work_timer_notification_callback(self, context: CountdownTimerContext):
         self._show_notification_callback("work")
@@ -300,5 +302,5 @@ class CountdownTimerController:
         self._show_notification_callback("break")
 
     def _play_sound_callback(self, context: CountdownTimerContext):
-        if self._play_sound:
-            playsound(utils.resource_provider.sound("notification.wav"))
+        if self._play_sound and self._sound_player is not None:
+            self._sound_player.play("notification.wav")
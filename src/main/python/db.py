@@ -1,14 +1,67 @@
+import heapq
+import logging
 import os.path
+import re
+import sqlite3
 import sys
+import threading
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from appdirs import user_data_dir
-from sqlalchemy import create_engine
+from sqlalchemy import case, column, create_engine, event, false, func, literal, null, select, table, true, \
+    tuple_, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
-
-from application.models import Activity, Base, BreakActivity, Settings, Task, WorkActivity
+from sqlalchemy.pool import StaticPool
+
+from application.diagnostics import format_stack
+from application.models import Base, BreakActivity, Settings, Task, WorkActivity
+from application.records import ActivityRecord, BreakActivityRecord, SettingsRecord, TaskRecord, WorkActivityRecord
+
+# FTS5 index of the task names, an external content table over task that is kept in sync by triggers.
+# Further text columns of a task (e.g. notes) have to be added to the table and all triggers.
+_TASK_SEARCH_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS "task-search" USING fts5(name, content='task', content_rowid='id',
+       prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS "task-search-insert" AFTER INSERT ON task BEGIN
+           INSERT INTO "task-search"(rowid, name) VALUES (new.id, new.name);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS "task-search-delete" AFTER DELETE ON task BEGIN
+           INSERT INTO "task-search"("task-search", rowid, name) VALUES ('delete', old.id, old.name);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS "task-search-update" AFTER UPDATE OF name ON task BEGIN
+           INSERT INTO "task-search"("task-search", rowid, name) VALUES ('delete', old.id, old.name);
+           INSERT INTO "task-search"(rowid, name) VALUES (new.id, new.name);
+       END"""
+)
+_TASK_SEARCH = table('task-search', column('rowid'), column('task-search'), column('rank'))
+
+
+def _is_task_search_statement(statement: str) -> bool:
+    # the FTS5 table can't be restored from a dump, it is left out and rebuilt by _create_task_search
+    if statement.startswith(('INSERT INTO sqlite_master', 'PRAGMA writable_schema', 'INSERT INTO "task-search')):
+        return True
+    return statement.startswith('CREATE') and 'task-search' in statement
+
+
+def _copy_database(source: sqlite3.Connection, target: sqlite3.Connection):
+    """
+        Copies the database of source into target, which has to be empty.
+        Uses the backup API where available (Python 3.7+), Python 3.6 replays an SQL dump without the task search
+        index.
+    """
+    if hasattr(source, 'backup'):
+        source.backup(target)
+        return
+
+    target.executescript("\n".join(statement for statement in source.iterdump()
+                                   if not _is_task_search_statement(statement)))
 
 
 class DBSessionManager(ABC):
@@ -19,114 +72,504 @@ class DBSessionManager(ABC):
 
 
 class SQLiteSessionManager(DBSessionManager):
-    def __init__(self, path_to_db: str = 'work-split-tracker.db'):
+    """
+        Session manager backed by a SQLite database file.
+        If in_memory is set the database is loaded into an in-memory database at startup and only written back to
+        the file when persist is called (e.g. periodically and at shutdown).
+    """
+    def __init__(self, path_to_db: str = 'work-split-tracker.db', in_memory: bool = False):
         if getattr(sys, 'frozen', False):
             app_dir = user_data_dir("work-split-tracker", "rMieep")
             Path(app_dir).mkdir(parents=True, exist_ok=True)
         else:
             app_dir = os.path.dirname(os.path.abspath(__file__))
-        engine = create_engine('sqlite:///' + app_dir + '/' + path_to_db)
+        self._path = app_dir + '/' + path_to_db
+        self._memory_connection = None
+
+        if in_memory:
+            self._memory_connection = sqlite3.connect(':memory:', check_same_thread=False)
+            if os.path.exists(self._path):
+                self._load()
+            engine = create_engine('sqlite://', creator=lambda: self._memory_connection, poolclass=StaticPool)
+        else:
+            engine = create_engine('sqlite:///' + self._path)
+
         Base.metadata.create_all(engine)
+        # create_all skips existing tables, including indexes added to them later on
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+        self._create_task_search(engine)
+        self._engine = engine
         self._sqlite_session = sessionmaker(bind=engine, expire_on_commit=False)
 
     @property
     def session(self):
         return self._sqlite_session
 
+    @property
+    def engine(self) -> Engine:
+        return self._engine
+
+    @staticmethod
+    def _create_task_search(engine):
+        try:
+            with engine.begin() as connection:
+                exists = connection.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task-search'").first()
+                for statement in _TASK_SEARCH_DDL:
+                    connection.exec_driver_sql(statement)
+                if not exists:
+                    # index the tasks created before the table existed
+                    connection.exec_driver_sql("""INSERT INTO "task-search"("task-search") VALUES ('rebuild')""")
+        except OperationalError:
+            # SQLite was built without FTS5, TaskRepositoryImpl.search falls back to LIKE
+            pass
+
+    @property
+    def in_memory(self) -> bool:
+        return self._memory_connection is not None
+
+    def _load(self):
+        disk_connection = sqlite3.connect(self._path)
+        try:
+            _copy_database(disk_connection, self._memory_connection)
+        finally:
+            disk_connection.close()
+
+    def persist(self):
+        """
+            Writes the in-memory database back to the database file. Does nothing if the database is not in memory.
+        """
+        if not self.in_memory:
+            return
+
+        # written to a new file that replaces the database file, a dump can only be replayed into an empty database
+        temporary_path = self._path + '.tmp'
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        disk_connection = sqlite3.connect(temporary_path)
+        try:
+            _copy_database(self._memory_connection, disk_connection)
+        finally:
+            disk_connection.close()
+        os.replace(temporary_path, self._path)
+
+    def close(self):
+        self.persist()
+        self._engine.dispose()
+
+
+class QueryThreadMonitor:
+    """
+        Flags the statements executed on a thread, by default the main (GUI) thread, with the code that issued them.
+        Statements are grouped by the first caller outside of this module and counted with their time, the engine
+        events are only listened to while the monitor is enabled.
+    """
+    _MAX_STATEMENT_LENGTH = 200
+
+    def __init__(self, engine: Engine, thread: Optional[threading.Thread] = None):
+        self._engine = engine
+        self._thread = thread or threading.main_thread()
+        self._enabled = False
+        # (call site, statement) -> [count, total seconds, max seconds, stack]
+        self._queries = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool):
+        if enabled == self._enabled:
+            return
+
+        self._enabled = enabled
+        for name, listener in (("before_cursor_execute", self._before_cursor_execute),
+                               ("after_cursor_execute", self._after_cursor_execute)):
+            if enabled:
+                event.listen(self._engine, name, listener)
+            else:
+                event.remove(self._engine, name, listener)
+
+    def queries(self) -> List[Tuple[str, str, int, float, float, Tuple[str, ...]]]:
+        """
+            (call site, statement, count, total seconds, max seconds, stack) of the flagged statements, most time first
+        """
+        queries = [key + tuple(value) for key, value in self._queries.items()]
+        return sorted(queries, key=lambda query: query[3], reverse=True)
+
+    def clear(self):
+        self._queries = {}
+
+    def to_dict(self) -> List[Dict]:
+        return [{'call_site': call_site, 'statement': statement, 'count': count, 'total_ms': total * 1000,
+                 'max_ms': maximum * 1000, 'stack': list(stack)}
+                for call_site, statement, count, total, maximum, stack in self.queries()]
+
+    def _before_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        if threading.current_thread() is self._thread:
+            connection.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        if threading.current_thread() is not self._thread or not connection.info.get('query_start'):
+            return
+
+        elapsed = time.perf_counter() - connection.info['query_start'].pop()
+        stack = format_stack(sys._getframe(1), exclude=(os.sep + "sqlalchemy" + os.sep,))
+        call_site = next((line for line in reversed(stack) if not line.startswith(__file__ + ":")), "")
+        statement = " ".join(statement.split())[:self._MAX_STATEMENT_LENGTH]
+
+        query = self._queries.get((call_site, statement))
+        if query is None:
+            logging.getLogger(__name__).warning("database queried on thread %s by %s", self._thread.name, call_site)
+            self._queries[(call_site, statement)] = [1, elapsed, elapsed, stack]
+        else:
+            query[0] = query[0] + 1
+            query[1] = query[1] + elapsed
+            query[2] = max(query[2], elapsed)
+            query[3] = stack
+
+
+class ActivityFilter:
+    """
+        Restricts the activities returned by WorkBreakActivityRepository.activity_page
+        work: only work (True) or break (False) activities, both if None
+        start, end: only activities started in [start, end)
+        task_id: only work activities of the task
+    """
+    __slots__ = ('work', 'start', 'end', 'task_id')
+
+    def __init__(self, work: Optional[bool] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 task_id: Optional[int] = None):
+        self.work = work
+        self.start = start
+        self.end = end
+        self.task_id = task_id
+
 
 class WorkActivityRepository(ABC):
     @property
     @abstractmethod
-    def work_activities(self) -> List[WorkActivity]:
+    def work_activities(self) -> List[WorkActivityRecord]:
         raise NotImplementedError
 
     @abstractmethod
-    def add_work_activity(self, activity: WorkActivity):
+    def add_work_activity(self, activity: WorkActivityRecord):
         raise NotImplementedError
 
     @abstractmethod
-    def update_work_activity(self, activity: WorkActivity):
+    def update_work_activity(self, activity: WorkActivityRecord):
         raise NotImplementedError
 
 
 class BreakActivityRepository(ABC):
     @property
     @abstractmethod
-    def break_activities(self) -> List[BreakActivity]:
+    def break_activities(self) -> List[BreakActivityRecord]:
         raise NotImplementedError
 
     @abstractmethod
-    def add_break_activity(self, activity: BreakActivity):
+    def add_break_activity(self, activity: BreakActivityRecord):
         raise NotImplementedError
 
     @abstractmethod
-    def update_break_activity(self, activity: BreakActivity):
+    def update_break_activity(self, activity: BreakActivityRecord):
         raise NotImplementedError
 
 
 class TaskRepository(ABC):
     @property
     @abstractmethod
-    def tasks(self) -> List[Task]:
+    def tasks(self) -> List[TaskRecord]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(self, task: TaskRecord):
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, task: TaskRecord):
         raise NotImplementedError
 
     @abstractmethod
-    def add(self, task: Task):
+    def update(self, task: TaskRecord):
         raise NotImplementedError
 
     @abstractmethod
-    def remove(self, task: Task):
+    def add_all(self, tasks: List[TaskRecord]):
         raise NotImplementedError
 
     @abstractmethod
-    def update(self, task: Task):
+    def remove_all(self, tasks: List[TaskRecord]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete_all(self, tasks: List[TaskRecord]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_priority(self, tasks: List[TaskRecord], priority: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def search(self, query: str, limit: int, completed: Optional[bool] = None) -> List[TaskRecord]:
         raise NotImplementedError
 
 
 class SettingsRepository(ABC):
     @abstractmethod
-    def get(self) -> Settings:
+    def get(self) -> SettingsRecord:
         raise NotImplementedError
 
     @abstractmethod
-    def update(self, settings: Settings):
+    def update(self, settings: SettingsRecord):
         raise NotImplementedError
 
 
+# Read paths select plain columns and build records from them, so no ORM instances are hydrated.
+# ORM instances are only created when writing.
+_ROW_BATCH_SIZE = 1000
+# bulk statements bind one parameter per id, older SQLite versions allow at most 999 parameters per statement
+_ID_BATCH_SIZE = 500
+
+
+def _activity_values(activity: ActivityRecord) -> dict:
+    return {
+        'date': activity.date,
+        'duration': activity.duration,
+        'expected_duration': activity.expected_duration
+    }
+
+
+def _task_columns() -> tuple:
+    # a session counts once it lasted, the same rule as TaskListModel.on_work_activity_updated
+    return (Task.name, Task.priority, Task.completed_workload, Task.total_workload, Task.completed, Task.id,
+            func.coalesce(func.sum(WorkActivity.duration), 0), func.count(case((WorkActivity.duration > 0, 1))))
+
+
+def _full_text_query(query: str) -> str:
+    # every word of the query as quoted prefix, so the input can't contain FTS5 syntax
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query.lower()))
+
+
+def _like_pattern(word: str) -> str:
+    # \w matches _, a wildcard of LIKE, the words have to match literally
+    escaped = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _id_batches(records: list) -> Iterator[List[int]]:
+    ids = [record.id for record in records]
+    for start in range(0, len(ids), _ID_BATCH_SIZE):
+        yield ids[start:start + _ID_BATCH_SIZE]
+
+
+def _task_values(task: TaskRecord) -> dict:
+    return {
+        'name': task.name,
+        'priority': task.priority,
+        'completed_workload': task.completed_workload,
+        'total_workload': task.total_workload,
+        'completed': task.completed
+    }
+
+
 class WorkBreakActivityRepository(WorkActivityRepository, BreakActivityRepository):
     def __init__(self, session_manager: DBSessionManager):
         self.__session_manager = session_manager
 
     @property
-    def work_activities(self) -> List[WorkActivity]:
+    def work_activities(self) -> List[WorkActivityRecord]:
         with self.__session_manager.session() as session:
-            return session.query(WorkActivity).all()
+            rows = session.query(WorkActivity.date, WorkActivity.expected_duration, WorkActivity.task_id,
+                                 WorkActivity.duration, WorkActivity.id).all()
+
+        return [WorkActivityRecord(*row) for row in rows]
 
     @property
-    def break_activities(self) -> List[BreakActivity]:
+    def break_activities(self) -> List[BreakActivityRecord]:
         with self.__session_manager.session() as session:
-            return session.query(BreakActivity).all()
+            rows = session.query(BreakActivity.date, BreakActivity.expected_duration, BreakActivity.duration,
+                                 BreakActivity.id).all()
+
+        return [BreakActivityRecord(*row) for row in rows]
 
     @property
-    def activities(self) -> List[Activity]:
+    def activities(self) -> List[ActivityRecord]:
+        return self.work_activities + self.break_activities
+
+    def activity_rows(self) -> Iterator[Tuple[bool, int, datetime, Optional[int], int, Optional[int]]]:
+        """
+            Streams the activities as (is_work, id, date, duration, expected_duration, task_id) tuples in the order of
+            activities, without building a record per row
+        """
+        with self.__session_manager.session() as session:
+            work_rows = session.query(WorkActivity.id, WorkActivity.date, WorkActivity.duration,
+                                      WorkActivity.expected_duration, WorkActivity.task_id)
+            for row in work_rows.yield_per(_ROW_BATCH_SIZE):
+                yield (True,) + tuple(row)
+
+            break_rows = session.query(BreakActivity.id, BreakActivity.date, BreakActivity.duration,
+                                       BreakActivity.expected_duration)
+            for row in break_rows.yield_per(_ROW_BATCH_SIZE):
+                yield (False,) + tuple(row) + (None,)
+
+    @staticmethod
+    def _activity_selects(activity_filter: ActivityFilter) -> list:
+        """
+            (is_work, select) of the work and break activities matching the filter, one select per table so each can
+            use the indexes of its table
+        """
+        work = select(literal(True).label('work'), WorkActivity.id, WorkActivity.date, WorkActivity.duration,
+                      WorkActivity.expected_duration, WorkActivity.task_id)
+        breaks = select(literal(False).label('work'), BreakActivity.id, BreakActivity.date, BreakActivity.duration,
+                        BreakActivity.expected_duration, null().label('task_id'))
+
+        if activity_filter.start:
+            work = work.where(WorkActivity.date >= activity_filter.start)
+            breaks = breaks.where(BreakActivity.date >= activity_filter.start)
+        if activity_filter.end:
+            work = work.where(WorkActivity.date < activity_filter.end)
+            breaks = breaks.where(BreakActivity.date < activity_filter.end)
+        if activity_filter.task_id is not None:
+            work = work.where(WorkActivity.task_id == activity_filter.task_id)
+            # breaks belong to no task
+            breaks = breaks.where(false())
+
+        if activity_filter.work:
+            return [(True, work)]
+        if activity_filter.work is False:
+            return [(False, breaks)]
+        if activity_filter.task_id is not None:
+            return [(True, work)]
+        return [(True, work), (False, breaks)]
+
+    def _filtered_activities(self, activity_filter: ActivityFilter):
+        selects = [activity_select for _, activity_select in self._activity_selects(activity_filter)]
+        return (selects[0] if len(selects) == 1 else union_all(*selects)).subquery()
+
+    @staticmethod
+    def _after(activities, sort_key, work: bool, after: tuple, descending: bool):
+        """
+            Condition of the activities of one table that follow the keyset after in the order (sort key, work, id).
+            work is the same for all activities of a table, so it decides whether the activities with the sort key of
+            the keyset are included instead of being compared in SQL, which would keep SQLite from using an index.
+            sort_key is None when sorted by work.
+        """
+        sort_value, after_work, after_id = after
+        if work == after_work:
+            if sort_key is None:
+                return activities.c.id < after_id if descending else activities.c.id > after_id
+            key = tuple_(sort_key, activities.c.id)
+            return key < tuple_(sort_value, after_id) if descending else key > tuple_(sort_value, after_id)
+
+        include_equal = (work > after_work) != descending
+        if sort_key is None:
+            return true() if include_equal else false()
+        if include_equal:
+            return sort_key <= sort_value if descending else sort_key >= sort_value
+        return sort_key < sort_value if descending else sort_key > sort_value
+
+    @staticmethod
+    def _sort_key(activities, sort_column: int):
+        # same column order as the ActivityTableModel, NULL durations are sorted as -1 to allow keyset paging
+        return (
+            activities.c.work,
+            activities.c.date,
+            func.coalesce(activities.c.duration, -1),
+            activities.c.expected_duration
+        )[sort_column]
+
+    def activity_count(self, activity_filter: ActivityFilter) -> int:
         with self.__session_manager.session() as session:
-            return session.query(WorkActivity).all() + session.query(BreakActivity).all()
+            return sum(session.execute(select(func.count()).select_from(activity_select.subquery())).scalar()
+                       for _, activity_select in self._activity_selects(activity_filter))
+
+    def activity_totals(self, group_format: str, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None) -> List[Tuple[str, int, int, int, int]]:
+        """
+            Groups the activities started in [start, end) by strftime(group_format, date) and returns
+            (group, work_count, work_seconds, break_count, break_seconds) tuples ordered by group
+        """
+        activities = self._filtered_activities(ActivityFilter(start=start, end=end))
+        group = func.strftime(group_format, activities.c.date)
+        duration = func.coalesce(activities.c.duration, 0)
+        query = select(
+            group,
+            func.sum(case((activities.c.work, 1), else_=0)),
+            func.sum(case((activities.c.work, duration), else_=0)),
+            func.sum(case((activities.c.work, 0), else_=1)),
+            func.sum(case((activities.c.work, 0), else_=duration))
+        ).group_by(group).order_by(group)
 
-    def add_work_activity(self, activity: WorkActivity):
+        with self.__session_manager.session() as session:
+            return [tuple(row) for row in session.execute(query)]
+
+    def activity_page(self, activity_filter: ActivityFilter, sort_column: int, descending: bool,
+                      after: Optional[tuple], limit: Optional[int]) -> List[tuple]:
+        """
+            Returns up to limit (all if None) activities as (is_work, id, date, duration, expected_duration, task_id)
+            tuples, ordered by the given column of the ActivityTableModel.
+            Pages are fetched with a keyset instead of an offset: after is the activity_page_key of the last row of
+            the previous page, or None for the first page. Each table is paged by its own query, which can use the
+            index of the sort column, and the pages are merged.
+        """
+        pages = []
+        with self.__session_manager.session() as session:
+            for work, activity_select in self._activity_selects(activity_filter):
+                activities = activity_select.subquery()
+                # the work column is the same for all activities of a table
+                sort_key = None if sort_column == 0 else self._sort_key(activities, sort_column)
+                key = (activities.c.id,) if sort_key is None else (sort_key, activities.c.id)
+                query = select(activities)
+
+                if after is not None:
+                    query = query.where(self._after(activities, sort_key, work, after, descending))
+                if descending:
+                    query = query.order_by(*(column.desc() for column in key))
+                else:
+                    query = query.order_by(*key)
+
+                pages.append([tuple(row) for row in session.execute(query.limit(limit))])
+
+        rows = heapq.merge(*pages, key=lambda row: self.activity_page_key(row, sort_column), reverse=descending)
+        return list(islice(rows, limit))
+
+    @staticmethod
+    def activity_page_key(row: tuple, sort_column: int) -> tuple:
+        is_work, activity_id, date, duration, expected_duration, task_id = row
+        sort_value = (is_work, date, -1 if duration is None else duration, expected_duration)[sort_column]
+        return sort_value, is_work, activity_id
+
+    def add_work_activity(self, activity: WorkActivityRecord):
         with self.__session_manager.session.begin() as session:
-            session.add(activity)
+            work_activity = WorkActivity(activity.date, activity.expected_duration, activity.task_id)
+            work_activity.duration = activity.duration
+            session.add(work_activity)
+            session.flush()
+            activity.id = work_activity.id
 
-    def add_break_activity(self, activity: BreakActivity):
+    def add_break_activity(self, activity: BreakActivityRecord):
         with self.__session_manager.session.begin() as session:
-            session.add(activity)
+            break_activity = BreakActivity(activity.date, activity.expected_duration)
+            break_activity.duration = activity.duration
+            session.add(break_activity)
+            session.flush()
+            activity.id = break_activity.id
+
+    def update_work_activity(self, activity: WorkActivityRecord):
+        values = _activity_values(activity)
+        values['task_id'] = activity.task_id
 
-    def update_work_activity(self, activity: WorkActivity):
         with self.__session_manager.session.begin() as session:
-            session.merge(activity)
+            session.query(WorkActivity).filter(WorkActivity.id == activity.id) \
+                .update(values, synchronize_session=False)
 
-    def update_break_activity(self, activity: BreakActivity):
+    def update_break_activity(self, activity: BreakActivityRecord):
         with self.__session_manager.session.begin() as session:
-            session.merge(activity)
+            session.query(BreakActivity).filter(BreakActivity.id == activity.id) \
+                .update(_activity_values(activity), synchronize_session=False)
 
 
 class TaskRepositoryImpl(TaskRepository):
@@ -134,37 +577,122 @@ class TaskRepositoryImpl(TaskRepository):
         self.__session_manager = session_manager
 
     @property
-    def tasks(self) -> List[Task]:
+    def tasks(self) -> List[TaskRecord]:
+        with self.__session_manager.session() as session:
+            rows = session.query(*_task_columns()) \
+                .outerjoin(WorkActivity, WorkActivity.task_id == Task.id) \
+                .group_by(Task.id) \
+                .all()
+
+        return [TaskRecord(*row) for row in rows]
+
+    def search(self, query: str, limit: int, completed: Optional[bool] = None) -> List[TaskRecord]:
+        """
+            Tasks with words starting with the words of the query, best ranked first
+        """
+        full_text_query = _full_text_query(query)
+        if not full_text_query:
+            return []
+
+        matches = select(Task.id, _TASK_SEARCH.c.rank.label('rank')) \
+            .join_from(_TASK_SEARCH, Task, Task.id == _TASK_SEARCH.c.rowid) \
+            .where(_TASK_SEARCH.c['task-search'].match(full_text_query))
+
         with self.__session_manager.session() as session:
-            return session.query(Task).all()
+            try:
+                rows = self._search_rows(session, matches, completed, limit)
+            except OperationalError:
+                matches = select(Task.id, Task.name.label('rank')) \
+                    .where(*(Task.name.ilike(_like_pattern(word), escape='\\') for word in re.findall(r'\w+', query)))
+                rows = self._search_rows(session, matches, completed, limit)
+
+        return [TaskRecord(*row) for row in rows]
+
+    @staticmethod
+    def _search_rows(session, matches, completed: Optional[bool], limit: int) -> list:
+        # the matches are limited before the activities of the remaining tasks are summed up
+        if completed is not None:
+            matches = matches.where(Task.completed == completed)
+        matches = matches.order_by('rank').limit(limit).subquery()
+
+        return session.query(*_task_columns()) \
+            .join(matches, matches.c.id == Task.id) \
+            .outerjoin(WorkActivity, WorkActivity.task_id == Task.id) \
+            .group_by(Task.id) \
+            .order_by(matches.c.rank) \
+            .all()
+
+    def add(self, task: TaskRecord):
+        with self.__session_manager.session.begin() as session:
+            orm_task = Task(task.name, task.priority, task.completed_workload, task.total_workload)
+            orm_task.completed = task.completed
+            session.add(orm_task)
+            session.flush()
+            task.id = orm_task.id
+
+    def remove(self, task: TaskRecord):
+        with self.__session_manager.session.begin() as session:
+            # same as the relationship would do on delete: detach the activities from the task
+            session.query(WorkActivity).filter(WorkActivity.task_id == task.id) \
+                .update({'task_id': None}, synchronize_session=False)
+            session.query(Task).filter(Task.id == task.id).delete(synchronize_session=False)
 
-    def add(self, task: Task):
+    def update(self, task: TaskRecord):
         with self.__session_manager.session.begin() as session:
-            session.add(task)
+            session.query(Task).filter(Task.id == task.id).update(_task_values(task), synchronize_session=False)
 
-    def remove(self, task: Task):
+    def add_all(self, tasks: List[TaskRecord]):
         with self.__session_manager.session.begin() as session:
-            session.delete(task)
+            orm_tasks = []
+            for task in tasks:
+                orm_task = Task(task.name, task.priority, task.completed_workload, task.total_workload)
+                orm_task.completed = task.completed
+                orm_tasks.append(orm_task)
+            session.add_all(orm_tasks)
+            session.flush()
+            for task, orm_task in zip(tasks, orm_tasks):
+                task.id = orm_task.id
+
+    def remove_all(self, tasks: List[TaskRecord]):
+        with self.__session_manager.session.begin() as session:
+            for ids in _id_batches(tasks):
+                session.query(WorkActivity).filter(WorkActivity.task_id.in_(ids)) \
+                    .update({'task_id': None}, synchronize_session=False)
+                session.query(Task).filter(Task.id.in_(ids)).delete(synchronize_session=False)
+
+    def complete_all(self, tasks: List[TaskRecord]):
+        self._update_all(tasks, {'completed': True})
+
+    def update_priority(self, tasks: List[TaskRecord], priority: int):
+        self._update_all(tasks, {'priority': priority})
 
-    def update(self, task: Task):
+    def _update_all(self, tasks: List[TaskRecord], values: dict):
         with self.__session_manager.session.begin() as session:
-            session.merge(task)
+            for ids in _id_batches(tasks):
+                session.query(Task).filter(Task.id.in_(ids)).update(values, synchronize_session=False)
 
 
 class SettingsRepositoryImpl(SettingsRepository):
     def __init__(self, session_manager: DBSessionManager):
         self.__session_manager = session_manager
 
-    def get(self) -> Settings:
+    def get(self) -> SettingsRecord:
         with self.__session_manager.session.begin() as session:
             settings = session.query(Settings).first()
 
             if not settings:
                 settings = Settings()
                 session.add(settings)
+                session.flush()
 
-        return settings
+            return SettingsRecord(settings.id, settings.work_time, settings.break_time, settings.play_sound,
+                                  settings.show_notification)
 
-    def update(self, settings: Settings):
+    def update(self, settings: SettingsRecord):
         with self.__session_manager.session.begin() as session:
-            session.merge(settings)
+            session.query(Settings).filter(Settings.id == settings.id).update({
+                'work_time': settings.work_time,
+                'break_time': settings.break_time,
+                'play_sound': settings.play_sound,
+                'show_notification': settings.show_notification
+            }, synchronize_session=False)
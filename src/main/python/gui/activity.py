@@ -1,97 +1,217 @@
-from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QVariant
+from array import array
+from datetime import datetime, timedelta
+from typing import Optional
 
-from application.models import Activity, BreakActivity, WorkActivity
+from PyQt5.QtCore import pyqtSignal, QAbstractTableModel, QModelIndex, Qt
+
+from application.records import ActivityRecord, BreakActivityRecord, WorkActivityRecord
 from db import WorkBreakActivityRepository
 
+# column arrays can't hold None, missing durations and task ids are stored as _NULL instead
+_NULL = -2 ** 63
+_NO_ROW = -1
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+_BREAK = 0
+_WORK = 1
+
+HORIZONTAL_HEADER = ['Name', 'Date', 'Duration', 'Expected Duration']
+DATE_FORMAT = "%d.%m.%y %H:%M:%S"
+
+_DISPLAY_ROLE = Qt.ItemDataRole.DisplayRole
+_USER_ROLE = Qt.ItemDataRole.UserRole
+# maximum number of rows whose formatted display values are kept, roughly a few screens of rows
+_DISPLAY_CACHE_SIZE = 4096
+
+
+def _is_work_activity(activity: ActivityRecord) -> bool:
+    return isinstance(activity, WorkActivityRecord)
+
+
+def _to_column(value: Optional[int]) -> int:
+    return _NULL if value is None else value
+
+
+def _from_column(value: int) -> Optional[int]:
+    return None if value == _NULL else value
 
-def _is_work_activity(activity: Activity) -> bool:
-    return isinstance(activity, WorkActivity)
+
+def _date_to_column(date: datetime) -> int:
+    return (date - _EPOCH) // _MICROSECOND
+
+
+def _date_from_column(value: int) -> datetime:
+    return _EPOCH + value * _MICROSECOND
 
 
 class ActivityTableModel(QAbstractTableModel):
     """
         Model that handles the insertion, deletion and manipulation of activities
+        The activities are stored column wise in arrays, a record is only created if a row is requested
+        with the UserRole. The display values of recently painted rows are cached.
     """
+    # the activity before and after the update
+    work_activity_updated = pyqtSignal(WorkActivityRecord, WorkActivityRecord)
+
     def __init__(self, activity_repository: WorkBreakActivityRepository, parent=None):
         super().__init__(parent)
         self._repository = activity_repository
-        self._data = self._repository.activities
-        self._horizontal_header = ['Name', 'Date', 'Duration', 'Expected Duration']
+        self._ids = array('q')
+        self._types = bytearray()
+        self._dates = array('q')
+        self._durations = array('q')
+        self._expected_durations = array('q')
+        self._task_ids = array('q')
+        # id -> row of the work and break activities, activities are only appended and their ids are
+        # increasing integers, so an array indexed by id is used instead of a dict
+        self._work_rows = array('q')
+        self._break_rows = array('q')
+        self._display_cache = {}
+        self._horizontal_header = HORIZONTAL_HEADER
+
+        for is_work, activity_id, date, duration, expected_duration, task_id in self._repository.activity_rows():
+            self._append(is_work, activity_id, date, duration, expected_duration, task_id)
 
     def rowCount(self, parent: QModelIndex = None) -> int:
-        return len(self._data)
+        return len(self._ids)
 
     def columnCount(self, parent: QModelIndex = None) -> int:
         return 4
 
-    def add_work_activity(self, item: WorkActivity, parent: QModelIndex = QModelIndex()) -> bool:
+    def _append(self, is_work: bool, activity_id: int, date: datetime, duration: Optional[int],
+                expected_duration: int, task_id: Optional[int]):
+        rows = self._work_rows if is_work else self._break_rows
+        if activity_id >= len(rows):
+            rows.extend([_NO_ROW] * (activity_id + 1 - len(rows)))
+        rows[activity_id] = len(self._ids)
+
+        self._ids.append(activity_id)
+        self._types.append(_WORK if is_work else _BREAK)
+        self._dates.append(_date_to_column(date))
+        self._durations.append(_to_column(duration))
+        self._expected_durations.append(expected_duration)
+        self._task_ids.append(_to_column(task_id))
+
+    def _append_activity(self, item: ActivityRecord, parent: QModelIndex):
+        task_id = item.task_id if _is_work_activity(item) else None
+
+        self.beginInsertRows(parent, self.rowCount(), self.rowCount())
+        self._append(_is_work_activity(item), item.id, item.date, item.duration, item.expected_duration, task_id)
+        self.endInsertRows()
+
+    def add_work_activity(self, item: WorkActivityRecord, parent: QModelIndex = QModelIndex()) -> bool:
         try:
             self._repository.add_work_activity(item)
         except:
             return False
 
-        self.beginInsertRows(parent, self.rowCount(), self.rowCount())
-        self._data.insert(self.rowCount(), item)
-        self.endInsertRows()
+        self._append_activity(item, parent)
 
         return True
 
-    def add_break_activity(self, item: BreakActivity, parent: QModelIndex = QModelIndex()) -> bool:
+    def add_break_activity(self, item: BreakActivityRecord, parent: QModelIndex = QModelIndex()) -> bool:
         try:
             self._repository.add_break_activity(item)
         except:
             return False
 
-        self.beginInsertRows(parent, self.rowCount(), self.rowCount())
-        self._data.insert(self.rowCount(), item)
-        self.endInsertRows()
+        self._append_activity(item, parent)
 
         return True
 
-    def update_work_activity(self, activity: WorkActivity):
+    def _update_activity(self, activity: ActivityRecord):
+        row = self._find_row_with_id(_is_work_activity(activity), activity.id)
+        self._dates[row] = _date_to_column(activity.date)
+        self._durations[row] = _to_column(activity.duration)
+        self._expected_durations[row] = activity.expected_duration
+        if _is_work_activity(activity):
+            self._task_ids[row] = _to_column(activity.task_id)
+        self._display_cache.pop(row, None)
+
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1), {})
+
+    def update_work_activity(self, activity: WorkActivityRecord):
         try:
             self._repository.update_work_activity(activity)
         except:
             return False
 
-        index = self._find_index_with_id(activity.id)
-        self.dataChanged.emit(index, index, {})
+        previous = self._record(self._find_row_with_id(True, activity.id))
+        self._update_activity(activity)
+        self.work_activity_updated.emit(previous, activity)
 
-    def update_break_activity(self, activity: BreakActivity):
+    def update_break_activity(self, activity: BreakActivityRecord):
         try:
             self._repository.update_break_activity(activity)
         except:
             return False
 
-        index = self._find_index_with_id(activity.id)
-        self.dataChanged.emit(index, index, {})
+        self._update_activity(activity)
 
-    def _find_index_with_id(self, activity_id: int):
-        for index, activity in enumerate(self._data):
-            if activity.id == activity_id:
-                return self.index(index, 0)
+    def _find_row_with_id(self, is_work: bool, activity_id: int) -> Optional[int]:
+        # work and break activities are stored in different tables, so their ids are only unique per type
+        rows = self._work_rows if is_work else self._break_rows
+        if activity_id < len(rows) and rows[activity_id] != _NO_ROW:
+            return rows[activity_id]
 
         return None
 
+    def _record(self, row: int) -> ActivityRecord:
+        date = _date_from_column(self._dates[row])
+        duration = _from_column(self._durations[row])
+
+        if self._types[row] == _WORK:
+            return WorkActivityRecord(date, self._expected_durations[row], _from_column(self._task_ids[row]),
+                                      duration, self._ids[row])
+        return BreakActivityRecord(date, self._expected_durations[row], duration, self._ids[row])
+
+    def activity_count(self, work: bool) -> int:
+        return self._types.count(_WORK if work else _BREAK)
+
+    def time_diff(self, work: bool) -> int:
+        """
+            Sum of duration - expected duration over all finished work or break activities
+        """
+        activity_type = _WORK if work else _BREAK
+        diff = 0
+
+        for row, duration in enumerate(self._durations):
+            if duration != _NULL and duration and self._types[row] == activity_type:
+                diff = diff + duration - self._expected_durations[row]
+
+        return diff
+
+    def timeline_columns(self) -> tuple:
+        """
+            Copies of the type, date and duration columns that can be read outside of the GUI thread
+        """
+        return bytes(self._types), array('q', self._dates), array('q', self._durations)
+
+    def _display_values(self, row: int) -> tuple:
+        values = self._display_cache.get(row)
+
+        if values is None:
+            if len(self._display_cache) >= _DISPLAY_CACHE_SIZE:
+                self._display_cache.clear()
+
+            values = (
+                "Work" if self._types[row] == _WORK else "Break",
+                _date_from_column(self._dates[row]).strftime(DATE_FORMAT),
+                _from_column(self._durations[row]),
+                self._expected_durations[row]
+            )
+            self._display_cache[row] = values
+
+        return values
+
     def data(self, index: QModelIndex, role: int = 0):
-        row = index.row()
-        column = index.column()
-        data = self._data[row]
-
-        if role == Qt.ItemDataRole.DisplayRole:
-            if column == 0:
-                if _is_work_activity(data):
-                    return QVariant("Work")
-                else:
-                    return QVariant("Break")
-            elif column == 1:
-                return QVariant(data.date.strftime("%d.%m.%y %H:%M:%S"))
-            elif column == 2:
-                return QVariant(data.duration)
-            elif column == 3:
-                return QVariant(data.expected_duration)
-        elif role == Qt.ItemDataRole.UserRole:
-            return QVariant(data)
+        if role == _DISPLAY_ROLE:
+            return self._display_values(index.row())[index.column()]
+        elif role == _USER_ROLE:
+            return self._record(index.row())
+
+        return None
 
     def headerData(self, col: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
         if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
@@ -100,4 +220,3 @@ class ActivityTableModel(QAbstractTableModel):
 
     def flags(self, index: QModelIndex) -> Qt.ItemFlag:
         return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
-
@@ -1,10 +1,11 @@
 from abc import ABC, abstractmethod
+from typing import List
 
 from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject
-from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QFormLayout, QLabel, QLineEdit, QPushButton, QSpinBox, \
-    QVBoxLayout, QWidget
+from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QFormLayout, QLabel, QLineEdit, QPlainTextEdit, QPushButton, \
+    QSpinBox, QVBoxLayout, QWidget
 
-from application.models import Task
+from application.records import TaskRecord
 
 
 class CreateEditTaskModel(QObject):
@@ -15,12 +16,12 @@ class CreateEditTaskModel(QObject):
     priority_changed = pyqtSignal(int)
     total_workload_changed = pyqtSignal(int)
 
-    def __init__(self, task: Task):
+    def __init__(self, task: TaskRecord):
         super().__init__()
         self._task = task
 
     @property
-    def task(self) -> Task:
+    def task(self) -> TaskRecord:
         return self._task
 
     @property
@@ -170,7 +171,7 @@ class CreateEditTaskDialog(QDialog):
     """
         Dialog used to create or edit tasks.
     """
-    def __init__(self, title: str, confirm_label: str, task: Task):
+    def __init__(self, title: str, confirm_label: str, task: TaskRecord):
         super(CreateEditTaskDialog, self).__init__()
 
         self.setWindowTitle(title)
@@ -224,13 +225,87 @@ class TaskCompletedDialog(QDialog):
         layout.addWidget(self._button_box)
 
 
+class PriorityDialog(QDialog):
+    """
+        Simple dialog used to ask the user for the new priority of the selected tasks.
+    """
+    def __init__(self, count: int):
+        super(PriorityDialog, self).__init__()
+
+        self.setWindowTitle("Change Priority")
+
+        self._reject_button = QPushButton(text="Cancel", parent=self)
+        self._confirm_button = QPushButton(text="Save", parent=self)
+
+        self._button_box = QDialogButtonBox()
+        self._button_box.addButton(self._reject_button, QDialogButtonBox.ButtonRole.RejectRole)
+        self._button_box.addButton(self._confirm_button, QDialogButtonBox.ButtonRole.AcceptRole)
+        self._button_box.accepted.connect(self.accept)
+        self._button_box.rejected.connect(self.reject)
+
+        self._priority_field = QSpinBox(self)
+        self._priority_field.setRange(1, 5)
+
+        layout = QFormLayout(self)
+        layout.addRow(QLabel(f"Priority of {count} tasks"), self._priority_field)
+        layout.addRow(self._button_box)
+
+    @property
+    def priority(self) -> int:
+        return self._priority_field.value()
+
+
+class ImportTasksDialog(QDialog):
+    """
+        Dialog used to create several tasks at once from a pasted list, one task per line.
+    """
+    def __init__(self):
+        super(ImportTasksDialog, self).__init__()
+
+        self.setWindowTitle("Import Tasks")
+
+        self._reject_button = QPushButton(text="Cancel", parent=self)
+        self._confirm_button = QPushButton(text="Import", parent=self)
+
+        self._button_box = QDialogButtonBox()
+        self._button_box.addButton(self._reject_button, QDialogButtonBox.ButtonRole.RejectRole)
+        self._button_box.addButton(self._confirm_button, QDialogButtonBox.ButtonRole.AcceptRole)
+        self._button_box.accepted.connect(self.accept)
+        self._button_box.rejected.connect(self.reject)
+
+        self._names_field = QPlainTextEdit(self)
+        self._names_field.setPlaceholderText("One task per line")
+
+        self._priority_field = QSpinBox(self)
+        self._priority_field.setRange(1, 5)
+
+        self._total_workload_field = QSpinBox(self)
+        self._total_workload_field.setMinimum(1)
+
+        layout = QFormLayout(self)
+        layout.addRow(self._names_field)
+        layout.addRow(QLabel("Priority"), self._priority_field)
+        layout.addRow(QLabel("Total Workload"), self._total_workload_field)
+        layout.addRow(self._button_box)
+
+    @property
+    def tasks(self) -> List[TaskRecord]:
+        names = (line.strip() for line in self._names_field.toPlainText().splitlines())
+        return [TaskRecord(name=name, priority=self._priority_field.value(), completed_workload=0,
+                           total_workload=self._total_workload_field.value()) for name in names if name]
+
+
 class CreateEditTaskDialogFactory(ABC):
     @abstractmethod
     def create_dialog(self) -> CreateEditTaskDialog:
         raise NotImplementedError
 
     @abstractmethod
-    def edit_dialog(self, task: Task) -> CreateEditTaskDialog:
+    def import_dialog(self) -> ImportTasksDialog:
+        raise NotImplementedError
+
+    @abstractmethod
+    def edit_dialog(self, task: TaskRecord) -> CreateEditTaskDialog:
         raise NotImplementedError
 
 
@@ -239,16 +314,19 @@ class CreateEditTaskDialogFactoryImpl(CreateEditTaskDialogFactory):
         return CreateEditTaskDialog(
             title="Create Task",
             confirm_label="Create",
-            task=Task(name="", priority=1, completed_workload=0, total_workload=1)
+            task=TaskRecord(name="", priority=1, completed_workload=0, total_workload=1)
         )
 
-    def edit_dialog(self, task: Task) -> CreateEditTaskDialog:
+    def edit_dialog(self, task: TaskRecord) -> CreateEditTaskDialog:
         return CreateEditTaskDialog(
             title="Edit Task",
             confirm_label="Save",
             task=task
         )
 
+    def import_dialog(self) -> ImportTasksDialog:
+        return ImportTasksDialog()
+
 
 class TaskCompletedDialogFactory(ABC):
     @abstractmethod
@@ -259,3 +337,14 @@ class TaskCompletedDialogFactory(ABC):
 class TaskCompletedDialogFactoryImpl(TaskCompletedDialogFactory):
     def create(self, name: str):
         return TaskCompletedDialog(name)
+
+
+class PriorityDialogFactory(ABC):
+    @abstractmethod
+    def create(self, count: int) -> PriorityDialog:
+        raise NotImplementedError
+
+
+class PriorityDialogFactoryImpl(PriorityDialogFactory):
+    def create(self, count: int) -> PriorityDialog:
+        return PriorityDialog(count)
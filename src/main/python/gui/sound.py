@@ -0,0 +1,33 @@
+from typing import Callable, Iterable
+
+from PyQt5.QtCore import QUrl
+from PyQt5.QtMultimedia import QSoundEffect
+
+from application.sound import SoundPlayer
+
+
+class QSoundEffectPlayer(SoundPlayer):
+    """
+        Plays sounds through QSoundEffect, which decodes a sound once and keeps its output stream open.
+        Playback starts within milliseconds and never blocks, so it runs on the GUI thread. QSoundEffect only supports
+        uncompressed WAV files.
+        sound_path resolves the file name of a bundled sound to its path.
+    """
+    def __init__(self, sound_path: Callable[[str], str], preload: Iterable[str] = ()):
+        self._sound_path = sound_path
+        self._effects = {}
+        for file_name in preload:
+            self._effect(file_name)
+
+    def play(self, file_name: str):
+        # playing again restarts a sound that is still playing
+        self._effect(file_name).play()
+
+    def _effect(self, file_name: str) -> QSoundEffect:
+        effect = self._effects.get(file_name)
+        if effect is None:
+            effect = QSoundEffect()
+            # loads asynchronously, play() before it finished loading starts once it has
+            effect.setSource(QUrl.fromLocalFile(self._sound_path(file_name)))
+            self._effects[file_name] = effect
+        return effect
@@ -1,26 +1,266 @@
-from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, QVariant
+from typing import Callable, Iterable, List, Optional
 
-from application.models import Task
+from PyQt5.QtCore import pyqtSlot, QAbstractListModel, QModelIndex, QObject, Qt, QTimer, QVariant
+from sortedcontainers import SortedList
+
+import utils
+from application.records import TaskRecord, WorkActivityRecord
+from application.search import TextIndex
 from db import TaskRepository
 
 
+class _RowIndex:
+    """
+        Maps ids to the rows of a list that is appended to and removed from.
+        Each id keeps the position it was appended at. Instead of renumbering all following ids when a row is removed,
+        the removed positions are remembered and subtracted on lookup, which keeps both operations at O(log n).
+    """
+    def __init__(self, ids: Iterable[Optional[int]]):
+        self._reset(ids)
+
+    def _reset(self, ids: Iterable[Optional[int]]):
+        self._positions = {}
+        self._removed = SortedList()
+        self._next_position = 0
+
+        for item_id in ids:
+            self.append(item_id)
+
+    def append(self, item_id: Optional[int]):
+        self._positions[item_id] = self._next_position
+        self._next_position = self._next_position + 1
+
+    def remove(self, item_id: Optional[int]):
+        self._removed.add(self._positions.pop(item_id))
+
+        # renumber once the removed positions outweigh the remaining ones
+        if len(self._removed) > len(self._positions):
+            self._reset(sorted(self._positions, key=self._positions.get))
+
+    def row(self, item_id: Optional[int]) -> Optional[int]:
+        position = self._positions.get(item_id)
+        if position is None:
+            return None
+
+        return position - self._removed.bisect_left(position)
+
+
+def _display_text(task: TaskRecord) -> str:
+    # the default task is the only task that is not stored and has no id
+    if task.id is None:
+        return f"{task.name} [{task.completed_workload}/{task.total_workload}]"
+    return f"{task.name} [{task.completed_workload}/{task.total_workload}] " \
+           f"{utils.convert_seconds_to_hours_string(task.tracked_seconds)}, {task.session_count} sessions"
+
+
+def _task_id(task: TaskRecord) -> int:
+    # the default task has no id, -1 sorts it before all stored tasks
+    return -1 if task.id is None else task.id
+
+
+def _priority_key(task: TaskRecord) -> tuple:
+    return -task.priority, _task_id(task)
+
+
+def _name_key(task: TaskRecord) -> tuple:
+    return task.name.lower(), _task_id(task)
+
+
+class SortedTaskListModel(QAbstractListModel):
+    """
+        Tasks of the TaskListModel accepted by a filter in the order of a sort key.
+        The TaskListModel keeps it up to date on every insert, update and remove, so the windows bound to it never
+        filter or sort the whole list. The sort keys end with the task id which makes them unique.
+    """
+    def __init__(self, tasks: Iterable[TaskRecord], key: Callable[[TaskRecord], tuple],
+                 accepts: Callable[[TaskRecord], bool], parent: QObject = None):
+        super().__init__(parent)
+        self._key = key
+        self._accepts = accepts
+        # id -> task and id -> key the task is currently sorted by, tasks are edited in place so the key has to be kept
+        self._tasks = {}
+        self._task_keys = {}
+        self._keys = SortedList()
+
+        for task in tasks:
+            if self._accepts(task):
+                self._tasks[_task_id(task)] = task
+                self._task_keys[_task_id(task)] = self._key(task)
+        self._keys.update(self._task_keys.values())
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._keys)
+
+    def task(self, row: int) -> TaskRecord:
+        return self._tasks[self._keys[row][-1]]
+
+    def index_of(self, task: TaskRecord) -> QModelIndex:
+        key = self._task_keys.get(_task_id(task))
+        if key is None:
+            return QModelIndex()
+
+        return self.index(self._keys.index(key))
+
+    def data(self, index: QModelIndex, role: int = 0):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return _display_text(self.task(index.row()))
+        elif role == Qt.ItemDataRole.UserRole:
+            return self.task(index.row())
+
+        return None
+
+    def add(self, task: TaskRecord):
+        if not self._accepts(task):
+            return
+
+        key = self._key(task)
+        row = self._keys.bisect_left(key)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._keys.add(key)
+        self._tasks[_task_id(task)] = task
+        self._task_keys[_task_id(task)] = key
+        self.endInsertRows()
+
+    def add_all(self, tasks: Iterable[TaskRecord]):
+        """
+            Adds the tasks with one insert signal per range of consecutive rows instead of one per task
+        """
+        added = sorted((self._key(task), task) for task in tasks if self._accepts(task))
+
+        start = 0
+        while start < len(added):
+            # the new keys sorted before the same existing key end up in consecutive rows
+            row = self._keys.bisect_left(added[start][0])
+            end = start + 1
+            while end < len(added) and (row == len(self._keys) or added[end][0] < self._keys[row]):
+                end = end + 1
+
+            self.beginInsertRows(QModelIndex(), row, row + end - start - 1)
+            for key, task in added[start:end]:
+                self._keys.add(key)
+                self._tasks[_task_id(task)] = task
+                self._task_keys[_task_id(task)] = key
+            self.endInsertRows()
+            start = end
+
+    def remove(self, task: TaskRecord):
+        key = self._task_keys.get(_task_id(task))
+        if key is None:
+            return
+
+        row = self._keys.index(key)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._keys[row]
+        del self._tasks[_task_id(task)]
+        del self._task_keys[_task_id(task)]
+        self.endRemoveRows()
+
+    def reset(self, tasks: Iterable[TaskRecord]):
+        """
+            Replaces all tasks with a single model reset, used for bulk changes instead of one signal per task
+        """
+        self.beginResetModel()
+        self._tasks = {}
+        self._task_keys = {}
+        for task in tasks:
+            if self._accepts(task):
+                self._tasks[_task_id(task)] = task
+                self._task_keys[_task_id(task)] = self._key(task)
+        self._keys = SortedList(self._task_keys.values())
+        self.endResetModel()
+
+    def update(self, task: TaskRecord):
+        key = self._task_keys.get(_task_id(task))
+        if key is None:
+            self.add(task)
+            return
+        if not self._accepts(task):
+            self.remove(task)
+            return
+
+        row = self._keys.index(key)
+        new_key = self._key(task)
+        if new_key != key:
+            # only the changed row moves, the position of the new key in the old order is the destination of
+            # beginMoveRows, the model is only changed after it
+            destination = self._keys.bisect_left(new_key)
+            new_row = destination - 1 if destination > row else destination
+            if new_row != row:
+                self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+            del self._keys[row]
+            self._keys.add(new_key)
+            self._task_keys[_task_id(task)] = new_key
+            if new_row != row:
+                self.endMoveRows()
+            row = new_row
+
+        index = self.index(row)
+        self.dataChanged.emit(index, index, {})
+
+
 class TaskListModel(QAbstractListModel):
     """
         Model that handles the insertion, deletion and manipulation of tasks
     """
-    DEFAULT = Task("None", 6, 0, 0)
-    SORT_PRIORITY_ROLE = Qt.ItemDataRole.UserRole + 1
-    SORT_NAME_ROLE = Qt.ItemDataRole.UserRole + 2
+    DEFAULT = TaskRecord("None", 6, 0, 0)
 
     def __init__(self, task_repository: TaskRepository, parent=None):
         super().__init__(parent)
         self._repository = task_repository
         self._data = [self.DEFAULT] + self._repository.tasks
+        self._rows = _RowIndex(task.id for task in self._data)
+
+        # open tasks shared by all windows, the default task is only selectable in the timer window
+        self._open_tasks_by_priority = SortedTaskListModel(self._data, _priority_key,
+                                                           lambda task: not task.completed, self)
+        self._open_tasks_by_name = SortedTaskListModel(self._data, _name_key,
+                                                       lambda task: task is not self.DEFAULT and not task.completed,
+                                                       self)
+        self._search_index = TextIndex()
+        for task in self._data:
+            self._update_search_index(task)
+
+    @property
+    def open_tasks_by_priority(self) -> SortedTaskListModel:
+        return self._open_tasks_by_priority
+
+    @property
+    def open_tasks_by_name(self) -> SortedTaskListModel:
+        return self._open_tasks_by_name
+
+    def search(self, query: str, limit: int) -> List[TaskRecord]:
+        """
+            Open tasks whose name matches the query, best matches first
+        """
+        return [self._data[self._rows.row(task_id)] for task_id in self._search_index.search(query, limit)]
+
+    def full_text_search(self, query: str, limit: int) -> List[TaskRecord]:
+        """
+            Open tasks found by the full text search of the repository, best ranked first
+        """
+        try:
+            records = self._repository.search(query, limit, completed=False)
+        except:
+            return []
+
+        rows = (self._rows.row(record.id) for record in records)
+        return [self._data[row] for row in rows if row is not None]
+
+    def _update_search_index(self, task: TaskRecord):
+        if task is self.DEFAULT or task.completed:
+            self._search_index.remove(task.id)
+        else:
+            self._search_index.add(task.id, task.name)
+
+    def _update_open_tasks(self, task: TaskRecord):
+        self._open_tasks_by_priority.update(task)
+        self._open_tasks_by_name.update(task)
+        self._update_search_index(task)
 
     def rowCount(self, parent: QModelIndex = None) -> int:
         return len(self._data)
 
-    def insert_task(self, row: int, item: Task, parent: QModelIndex = QModelIndex()) -> bool:
+    def insert_task(self, row: int, item: TaskRecord, parent: QModelIndex = QModelIndex()) -> bool:
         try:
             self._repository.add(item)
         except:
@@ -28,25 +268,137 @@ class TaskListModel(QAbstractListModel):
 
         self.beginInsertRows(parent, row, row)
         self._data.insert(row, item)
+        if row == len(self._data) - 1:
+            self._rows.append(item.id)
+        else:
+            self._rows = _RowIndex(task.id for task in self._data)
+        self.endInsertRows()
+
+        self._open_tasks_by_priority.add(item)
+        self._open_tasks_by_name.add(item)
+        self._update_search_index(item)
+
+        return True
+
+    def insert_tasks(self, row: int, items: List[TaskRecord], parent: QModelIndex = QModelIndex()) -> bool:
+        """
+            Inserts the tasks in one transaction and as one contiguous range of rows
+        """
+        if not items:
+            return True
+
+        try:
+            self._repository.add_all(items)
+        except:
+            return False
+
+        self.beginInsertRows(parent, row, row + len(items) - 1)
+        appended = row == len(self._data)
+        self._data[row:row] = items
+        if appended:
+            for item in items:
+                self._rows.append(item.id)
+        else:
+            self._rows = _RowIndex(task.id for task in self._data)
         self.endInsertRows()
 
+        self._open_tasks_by_priority.add_all(items)
+        self._open_tasks_by_name.add_all(items)
+        for item in items:
+            self._update_search_index(item)
+
         return True
 
     def remove_task(self, index: QModelIndex) -> bool:
-        task = index.data(Qt.ItemDataRole.UserRole)
+        row = index.row()
+        task = self._data[row]
 
         try:
             self._repository.remove(task)
         except:
             return False
 
-        self.beginRemoveRows(index, index.row(), index.row())
-        self._data.remove(task)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._data[row]
+        self._rows.remove(task.id)
         self.endRemoveRows()
 
+        self._open_tasks_by_priority.remove(task)
+        self._open_tasks_by_name.remove(task)
+        self._search_index.remove(task.id)
+
+        return True
+
+    def remove_tasks(self, tasks: List[TaskRecord]) -> bool:
+        """
+            Removes the tasks in one transaction and resets the model once
+        """
+        try:
+            self._repository.remove_all(tasks)
+        except:
+            return False
+
+        removed = {task.id for task in tasks}
+        self.beginResetModel()
+        self._data = [task for task in self._data if task is self.DEFAULT or task.id not in removed]
+        self._rows = _RowIndex(task.id for task in self._data)
+        self.endResetModel()
+
+        for task in tasks:
+            self._search_index.remove(task.id)
+        self._reset_open_tasks()
+
+        return True
+
+    def complete_tasks(self, tasks: List[TaskRecord]) -> bool:
+        try:
+            self._repository.complete_all(tasks)
+        except:
+            return False
+
+        for task in tasks:
+            task.completed = True
+        self._tasks_changed(tasks)
+
         return True
 
-    def setData(self, index: QModelIndex, value: Task, role: int = ...) -> bool:
+    def update_priority(self, tasks: List[TaskRecord], priority: int) -> bool:
+        try:
+            self._repository.update_priority(tasks, priority)
+        except:
+            return False
+
+        for task in tasks:
+            task.priority = priority
+        self._tasks_changed(tasks)
+
+        return True
+
+    def _tasks_changed(self, tasks: List[TaskRecord]):
+        changed = [(row, task) for row, task in ((self._rows.row(task.id), task) for task in tasks) if row is not None]
+        if not changed:
+            return
+
+        # one signal for the range spanning all changed rows
+        rows = [row for row, _ in changed]
+        self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)), {})
+
+        # only the changed tasks move in or out of the open tasks
+        for _, task in changed:
+            self._update_open_tasks(task)
+
+    def _reset_open_tasks(self):
+        self._open_tasks_by_priority.reset(self._data)
+        self._open_tasks_by_name.reset(self._data)
+
+    def index_of(self, task: TaskRecord) -> QModelIndex:
+        row = self._rows.row(task.id)
+        if row is None:
+            return QModelIndex()
+
+        return self.index(row)
+
+    def setData(self, index: QModelIndex, value: TaskRecord, role: int = ...) -> bool:
         if index.isValid():
             try:
                 self._repository.update(value)
@@ -54,19 +406,167 @@ class TaskListModel(QAbstractListModel):
                 return False
 
             self.dataChanged.emit(index, index, {})
+            self._update_open_tasks(value)
             return True
 
         return False
 
+    @pyqtSlot(WorkActivityRecord, WorkActivityRecord)
+    def on_work_activity_updated(self, previous: WorkActivityRecord, activity: WorkActivityRecord):
+        # the activity may be updated more than once, what it counted before is replaced by what it counts now,
+        # a session counts once it lasted, the same rule as the task query of the repository
+        changes = {}
+        for record, sign in ((previous, -1), (activity, 1)):
+            if record.task_id is not None and record.duration is not None and record.duration > 0:
+                seconds, sessions = changes.get(record.task_id, (0, 0))
+                changes[record.task_id] = (seconds + sign * record.duration, sessions + sign)
+
+        for task_id, (seconds, sessions) in changes.items():
+            row = self._rows.row(task_id)
+            if row is None or (seconds == 0 and sessions == 0):
+                continue
+
+            task = self._data[row]
+            task.tracked_seconds = task.tracked_seconds + seconds
+            task.session_count = task.session_count + sessions
+            index = self.index(row)
+            self.dataChanged.emit(index, index, {})
+            self._update_open_tasks(task)
+
     def data(self, index: QModelIndex, role: int = 0):
         row = index.row()
         data = self._data[row]
 
         if role == Qt.ItemDataRole.DisplayRole:
-            return QVariant(f"{data.name} [{data.completed_workload}/{data.total_workload}]")
+            return QVariant(_display_text(data))
         elif role == Qt.ItemDataRole.UserRole:
             return QVariant(data)
-        elif role == Qt.ItemDataRole.UserRole + 1:
-            return QVariant(data.priority)
-        elif role == Qt.ItemDataRole.UserRole + 2:
-            return QVariant(data.name)
+
+
+class TaskSearchModel(QAbstractListModel):
+    """
+        At most limit open tasks matching a search query, without a query the open tasks with the highest priority.
+        Only the matches are looked up and shown, no matter how many tasks there are.
+        The matches are found by the in memory search of the TaskListModel unless another search is given.
+        The pinned task is shown after the matches even if it doesn't match, e.g. the selected task of a combo box.
+    """
+    def __init__(self, task_model: TaskListModel, limit: int = 50,
+                 search: Optional[Callable[[str, int], List[TaskRecord]]] = None, parent: QObject = None):
+        super().__init__(parent)
+        self._task_model = task_model
+        self._limit = limit
+        self._search_function = search or task_model.search
+        self._query = ""
+        self._pinned = None
+        self._matches = self._search()
+        self._tasks = self._with_pinned(self._matches)
+        self._paused = False
+        self._stale = False
+
+        # a bulk change of the open tasks signals once per task, they are searched once after all of them
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(0)
+        self._refresh_timer.timeout.connect(self.refresh)
+
+        open_tasks = task_model.open_tasks_by_priority
+        open_tasks.rowsInserted.connect(self._on_open_tasks_changed)
+        open_tasks.rowsRemoved.connect(self._on_open_tasks_changed)
+        open_tasks.rowsMoved.connect(self._on_open_tasks_changed)
+        open_tasks.dataChanged.connect(self._on_open_tasks_changed)
+        # bulk removals and completions replace the open tasks with a single reset
+        open_tasks.modelReset.connect(self._on_open_tasks_changed)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def task(self, row: int) -> TaskRecord:
+        return self._tasks[row]
+
+    @property
+    def match_count(self) -> int:
+        """
+            Number of rows matching the query, the pinned task is shown after them if it isn't one of them
+        """
+        return len(self._matches)
+
+    def row_of(self, task: TaskRecord) -> int:
+        for row, shown_task in enumerate(self._tasks):
+            if shown_task is task:
+                return row
+
+        return -1
+
+    def data(self, index: QModelIndex, role: int = 0):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return _display_text(self._tasks[index.row()])
+        elif role == Qt.ItemDataRole.UserRole:
+            return self._tasks[index.row()]
+
+        return None
+
+    @property
+    def paused(self) -> bool:
+        """
+            A paused model doesn't search again when the open tasks change, it catches up once it is resumed
+        """
+        return self._paused
+
+    @paused.setter
+    def paused(self, paused: bool):
+        self._paused = paused
+        if not paused and self._stale:
+            self.refresh()
+
+    @property
+    def pinned(self) -> Optional[TaskRecord]:
+        return self._pinned
+
+    @pinned.setter
+    def pinned(self, task: Optional[TaskRecord]):
+        if task is self._pinned:
+            return
+
+        self._pinned = task
+        self._show(self._matches)
+
+    def set_query(self, query: str):
+        self._query = query
+        self.refresh()
+
+    @pyqtSlot()
+    def _on_open_tasks_changed(self):
+        if self._paused:
+            self._stale = True
+        else:
+            self._refresh_timer.start()
+
+    @pyqtSlot()
+    def refresh(self):
+        self._refresh_timer.stop()
+        self._stale = False
+        self._show(self._search())
+
+    def _show(self, matches: List[TaskRecord]):
+        self._matches = matches
+        tasks = self._with_pinned(matches)
+        if len(tasks) == len(self._tasks) and all(task is shown_task for task, shown_task in zip(tasks, self._tasks)):
+            if tasks:
+                self.dataChanged.emit(self.index(0), self.index(len(tasks) - 1), {})
+            return
+
+        self.beginResetModel()
+        self._tasks = tasks
+        self.endResetModel()
+
+    def _search(self) -> List[TaskRecord]:
+        if self._query.strip():
+            return self._search_function(self._query, self._limit)
+
+        open_tasks = self._task_model.open_tasks_by_priority
+        return [open_tasks.task(row) for row in range(min(self._limit, open_tasks.rowCount()))]
+
+    def _with_pinned(self, matches: List[TaskRecord]) -> List[TaskRecord]:
+        if self._pinned is None or any(task is self._pinned for task in matches):
+            return matches
+        return matches + [self._pinned]
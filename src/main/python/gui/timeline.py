@@ -0,0 +1,426 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QPoint, QRectF, QRunnable, Qt, QThreadPool
+from PyQt5.QtGui import QColor, QMouseEvent, QPainter, QPaintEvent, QResizeEvent, QWheelEvent
+from PyQt5.QtWidgets import QToolTip, QWidget
+
+import utils
+from gui.activity import ActivityTableModel
+
+# times are kept in microseconds since the epoch like the date column of the activity model
+_SECOND = 1000000
+_HOUR = 3600 * _SECOND
+_DAY = 24 * _HOUR
+_EPOCH = datetime(1970, 1, 1)
+
+_BREAK = 0
+_WORK = 1
+_LANE_LABELS = ('Break', 'Work')
+_LANE_COLORS = (QColor(76, 175, 80), QColor(66, 133, 244))
+
+_MIN_SPAN = 10 * 60 * _SECOND
+_MAX_SPAN = 5 * 365 * _DAY
+_DEFAULT_SPAN = 7 * _DAY
+# tick steps of the time axis and the format of their labels, the smallest step that keeps the labels apart is used
+_TICKS = (
+    (_HOUR, "%H:%M"),
+    (6 * _HOUR, "%d.%m. %H:%M"),
+    (_DAY, "%a %d.%m."),
+    (7 * _DAY, "%d.%m.%y"),
+    (30 * _DAY, "%m.%Y"),
+    (365 * _DAY, "%Y")
+)
+_MIN_TICK_DISTANCE = 100
+_AXIS_HEIGHT = 20
+_LABEL_WIDTH = 50
+
+
+def _to_datetime(time: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=time)
+
+
+def _to_time(date: datetime) -> int:
+    return (date - _EPOCH) // timedelta(microseconds=1)
+
+
+class _Sessions:
+    """
+        Finished activities sorted by their start, built from a copy of the activity model columns
+    """
+    __slots__ = ('starts', 'ends', 'types', 'max_duration')
+
+    def __init__(self, types: bytes, dates: array, durations: array):
+        # unfinished activities have no (negative) duration and are left out
+        rows = sorted((row for row in range(len(dates)) if durations[row] > 0), key=dates.__getitem__)
+
+        self.starts = array('q', (dates[row] for row in rows))
+        self.ends = array('q', (dates[row] + durations[row] * _SECOND for row in rows))
+        self.types = bytes(types[row] for row in rows)
+        self.max_duration = max((durations[row] for row in rows), default=0) * _SECOND
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def visible(self, start: int, end: int) -> range:
+        """
+            Positions of the sessions that overlap the time range, the overlap is checked when iterating
+        """
+        return range(bisect_left(self.starts, start - self.max_duration), bisect_left(self.starts, end))
+
+
+class _Buckets:
+    """
+        Sum of the tracked seconds and the shortest and longest session per lane and pixel column
+    """
+    __slots__ = ('start', 'end', 'columns', 'sums', 'mins', 'maxs')
+
+    def __init__(self, sessions: _Sessions, start: int, end: int, columns: int):
+        self.start = start
+        self.end = end
+        self.columns = columns
+        self.sums = ([0] * columns, [0] * columns)
+        self.mins = ([0] * columns, [0] * columns)
+        self.maxs = ([0] * columns, [0] * columns)
+
+        width = (end - start) / columns
+        for position in sessions.visible(start, end):
+            session_start = sessions.starts[position]
+            session_end = sessions.ends[position]
+            if session_end <= start:
+                continue
+
+            lane = sessions.types[position]
+            sums, mins, maxs = self.sums[lane], self.mins[lane], self.maxs[lane]
+            duration = (session_end - session_start) // _SECOND
+            first = max(int((session_start - start) / width), 0)
+            last = min(int((session_end - start) / width), columns - 1)
+
+            for column in range(first, last + 1):
+                column_start = start + column * width
+                sums[column] += int(min(session_end, column_start + width) - max(session_start, column_start))
+                if not mins[column] or duration < mins[column]:
+                    mins[column] = duration
+                if duration > maxs[column]:
+                    maxs[column] = duration
+
+
+class _JobSignals(QObject):
+    finished = pyqtSignal(object)
+
+
+class _Job(QRunnable):
+    """
+        Runs a function in the global thread pool and emits its result in the thread of the receiver
+    """
+    def __init__(self, function: Callable, *args):
+        super(_Job, self).__init__()
+        self.signals = _JobSignals()
+        self._function = function
+        self._args = args
+
+    def run(self):
+        self.signals.finished.emit(self._function(*self._args))
+
+
+class TimelineModel(QObject):
+    """
+        Model of the timeline.
+        If the visible range holds fewer sessions than there are pixel columns the sessions are drawn one by one,
+        otherwise the range is downsampled to one bucket per pixel column. Sorting the sessions and computing the
+        buckets is done in a background thread, at most one job runs at a time and requests made meanwhile are
+        coalesced into the next one.
+    """
+    changed = pyqtSignal()
+
+    def __init__(self, activity_model: ActivityTableModel, parent: QObject = None):
+        super(TimelineModel, self).__init__(parent)
+        self._activity_model = activity_model
+        self._sessions = None
+        self._buckets = None
+        self._start = None
+        self._end = None
+        self._columns = 1
+
+        self._job = None
+        self._sessions_requested = False
+        self._buckets_requested = False
+        self._paused = False
+        self._stale = False
+
+        activity_model.rowsInserted.connect(self._on_activities_changed)
+        activity_model.dataChanged.connect(self._on_activities_changed)
+
+        self.reload()
+
+    @property
+    def start(self) -> int:
+        return self._start
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+    @property
+    def sessions(self) -> Optional[_Sessions]:
+        return self._sessions
+
+    @property
+    def buckets(self) -> Optional[_Buckets]:
+        """
+            Buckets of the last finished job, they may cover a different range while a newer job is running
+        """
+        return self._buckets
+
+    @property
+    def detailed(self) -> bool:
+        return self._sessions is not None and len(self._sessions.visible(self._start, self._end)) <= self._columns
+
+    def set_range(self, start: int, end: int, columns: int):
+        span = min(max(end - start, _MIN_SPAN), _MAX_SPAN)
+        self._start = start
+        self._end = start + span
+        self._columns = max(columns, 1)
+
+        if self._sessions is not None and not self.detailed:
+            self._buckets_requested = True
+            self._run_next_job()
+        self.changed.emit()
+
+    def set_columns(self, columns: int):
+        self._columns = max(columns, 1)
+        if self._start is not None:
+            self.set_range(self._start, self._end, columns)
+
+    @property
+    def paused(self) -> bool:
+        """
+            A paused model doesn't start jobs for the changed activities, it reloads once it is resumed
+        """
+        return self._paused
+
+    @paused.setter
+    def paused(self, paused: bool):
+        self._paused = paused
+        if not paused and self._stale:
+            self.reload()
+
+    @pyqtSlot()
+    def reload(self):
+        self._stale = False
+        self._sessions_requested = True
+        self._run_next_job()
+
+    @pyqtSlot()
+    def _on_activities_changed(self):
+        if self._paused:
+            self._stale = True
+        else:
+            self.reload()
+
+    def _run_next_job(self):
+        if self._job is not None:
+            return
+
+        if self._sessions_requested:
+            self._sessions_requested = False
+            self._job = _Job(_Sessions, *self._activity_model.timeline_columns())
+            self._job.signals.finished.connect(self._on_sessions_finished)
+        elif self._buckets_requested:
+            self._buckets_requested = False
+            self._job = _Job(_Buckets, self._sessions, self._start, self._end, self._columns)
+            self._job.signals.finished.connect(self._on_buckets_finished)
+        else:
+            return
+
+        QThreadPool.globalInstance().start(self._job)
+
+    @pyqtSlot(object)
+    def _on_sessions_finished(self, sessions: _Sessions):
+        self._job = None
+        self._sessions = sessions
+
+        if self._start is None:
+            end = sessions.ends[-1] if len(sessions) else _to_time(datetime.now())
+            self._start, self._end = end - _DEFAULT_SPAN, end
+
+        self._buckets_requested = not self.detailed
+        self._run_next_job()
+        self.changed.emit()
+
+    @pyqtSlot(object)
+    def _on_buckets_finished(self, buckets: _Buckets):
+        self._job = None
+        self._buckets = buckets
+        self._run_next_job()
+        self.changed.emit()
+
+
+class TimelineController(QObject):
+    """
+        Controller of the timeline, translates panning and zooming in pixels to time ranges
+    """
+    def __init__(self, model: TimelineModel):
+        super(TimelineController, self).__init__()
+        self._model = model
+
+    def pan(self, pixels: int, width: int):
+        if self._model.start is None:
+            return
+
+        offset = int(pixels * (self._model.end - self._model.start) / width)
+        self._model.set_range(self._model.start - offset, self._model.end - offset, width)
+
+    def zoom(self, factor: float, anchor: int, width: int):
+        if self._model.start is None:
+            return
+
+        # keep the time under the cursor in place
+        span = self._model.end - self._model.start
+        time = self._model.start + span * anchor / width
+        new_span = min(max(int(span * factor), _MIN_SPAN), _MAX_SPAN)
+        start = int(time - new_span * anchor / width)
+        self._model.set_range(start, start + new_span, width)
+
+    def resize(self, width: int):
+        self._model.set_columns(width)
+
+
+class TimelineView(QWidget):
+    """
+        Timeline of the work and break activities with one lane per activity type.
+        Drag to pan, use the mouse wheel to zoom.
+    """
+    def __init__(self, controller: TimelineController, model: TimelineModel, parent: QWidget = None):
+        super(TimelineView, self).__init__(parent)
+        self._controller = controller
+        self._model = model
+        self._drag_position = None
+
+        self.setMouseTracking(True)
+        self.setMinimumHeight(120)
+
+        self._model.changed.connect(self.update)
+
+    def _chart_width(self) -> int:
+        return max(self.width() - _LABEL_WIDTH, 1)
+
+    def _lane_rect(self, lane: int) -> QRectF:
+        height = (self.height() - _AXIS_HEIGHT) / 2
+        # work is drawn on top
+        top = 0 if lane == _WORK else height
+        return QRectF(_LABEL_WIDTH, top, self._chart_width(), height)
+
+    def _x(self, time: float) -> float:
+        return _LABEL_WIDTH + (time - self._model.start) * self._chart_width() / (self._model.end - self._model.start)
+
+    def paintEvent(self, event: QPaintEvent):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+
+        for lane in (_WORK, _BREAK):
+            rect = self._lane_rect(lane)
+            painter.drawText(QRectF(0, rect.top(), _LABEL_WIDTH, rect.height()), Qt.AlignmentFlag.AlignCenter,
+                             _LANE_LABELS[lane])
+
+        if self._model.start is not None and self._model.sessions is not None:
+            painter.setClipRect(QRectF(_LABEL_WIDTH, 0, self._chart_width(), self.height()))
+            if self._model.detailed:
+                self._paint_sessions(painter)
+            elif self._model.buckets is not None:
+                self._paint_buckets(painter)
+            self._paint_axis(painter)
+
+        painter.end()
+
+    def _paint_sessions(self, painter: QPainter):
+        sessions = self._model.sessions
+        lanes = (self._lane_rect(_BREAK), self._lane_rect(_WORK))
+
+        for position in sessions.visible(self._model.start, self._model.end):
+            lane = lanes[sessions.types[position]]
+            left = self._x(sessions.starts[position])
+            right = max(self._x(sessions.ends[position]), left + 1)
+            painter.fillRect(QRectF(left, lane.top() + 2, right - left, lane.height() - 4),
+                             _LANE_COLORS[sessions.types[position]])
+
+    def _paint_buckets(self, painter: QPainter):
+        # the buckets may be computed for a previous range, so their columns are mapped to the current one
+        buckets = self._model.buckets
+        width = (buckets.end - buckets.start) / buckets.columns
+        column_width = max(self._x(buckets.start + width) - self._x(buckets.start), 1)
+
+        for lane_type in (_BREAK, _WORK):
+            lane = self._lane_rect(lane_type)
+            color = _LANE_COLORS[lane_type]
+            for column, tracked in enumerate(buckets.sums[lane_type]):
+                if tracked:
+                    # the bar height shows how much of the column is covered by sessions
+                    height = min(tracked / width, 1) * (lane.height() - 4)
+                    painter.fillRect(QRectF(self._x(buckets.start + column * width), lane.bottom() - 2 - height,
+                                            column_width, max(height, 1)), color)
+
+    def _paint_axis(self, painter: QPainter):
+        span = self._model.end - self._model.start
+        step, date_format = _TICKS[-1]
+        for tick_step, tick_format in _TICKS:
+            if tick_step * self._chart_width() / span >= _MIN_TICK_DISTANCE:
+                step, date_format = tick_step, tick_format
+                break
+
+        painter.setPen(self.palette().mid().color())
+        axis_top = self.height() - _AXIS_HEIGHT
+        # the epoch is a thursday, weekly ticks are moved to mondays
+        offset = 4 * _DAY if step == 7 * _DAY else 0
+        tick = self._model.start - (self._model.start - offset) % step + step
+        while tick < self._model.end:
+            x = self._x(tick)
+            painter.drawLine(int(x), 0, int(x), axis_top)
+            painter.drawText(QRectF(x + 2, axis_top, _MIN_TICK_DISTANCE, _AXIS_HEIGHT),
+                             Qt.AlignmentFlag.AlignVCenter, _to_datetime(tick).strftime(date_format))
+            tick += step
+
+    def _tooltip(self, position: QPoint) -> Optional[str]:
+        if self._model.detailed or self._model.buckets is None:
+            return None
+
+        for lane_type in (_BREAK, _WORK):
+            if self._lane_rect(lane_type).contains(position):
+                buckets = self._model.buckets
+                time = self._model.start + (position.x() - _LABEL_WIDTH) * (self._model.end - self._model.start) / \
+                    self._chart_width()
+                column = int((time - buckets.start) * buckets.columns / (buckets.end - buckets.start))
+                if 0 <= column < buckets.columns and buckets.sums[lane_type][column]:
+                    return f"{_LANE_LABELS[lane_type]}: " \
+                           f"{utils.convert_seconds_to_hours_string(buckets.sums[lane_type][column] // _SECOND)}, " \
+                           f"min {utils.convert_seconds_to_time_string(buckets.mins[lane_type][column])}, " \
+                           f"max {utils.convert_seconds_to_time_string(buckets.maxs[lane_type][column])}"
+        return None
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._drag_position = event.pos()
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        if self._drag_position is not None:
+            self._controller.pan(event.pos().x() - self._drag_position.x(), self._chart_width())
+            self._drag_position = event.pos()
+        else:
+            tooltip = self._tooltip(event.pos())
+            if tooltip:
+                QToolTip.showText(event.globalPos(), tooltip, self)
+            else:
+                QToolTip.hideText()
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        self._drag_position = None
+
+    def wheelEvent(self, event: QWheelEvent):
+        factor = 0.8 if event.angleDelta().y() > 0 else 1.25
+        self._controller.zoom(factor, max(event.pos().x() - _LABEL_WIDTH, 0), self._chart_width())
+
+    def resizeEvent(self, event: QResizeEvent):
+        self._controller.resize(self._chart_width())
+        super(TimelineView, self).resizeEvent(event)
@@ -0,0 +1,31 @@
+from typing import Callable
+
+from PyQt5.QtCore import QTimer
+
+from application.timer import Timer
+
+
+class QTimerAdapter(Timer):
+    """
+        Timer implementation using the QTimer class provided by the PyQt framework
+    """
+    def __init__(self, task: Callable[[], None] = lambda: None, interval: int = 1000):
+        super(QTimerAdapter, self).__init__(task, interval)
+        self._timer = QTimer()
+        self._timer.interval = self._interval
+
+    @Timer.task.setter
+    def task(self, task: Callable):
+        self._task = task
+        if not self._task:
+            self._timer.timeout.disconnect()
+        self._timer.timeout.connect(self.task)
+
+    def start(self):
+        self._timer.start(self._interval)
+
+    def stop(self):
+        self._timer.stop()
+
+    def is_active(self) -> bool:
+        return self._timer.isActive()
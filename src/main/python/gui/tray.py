@@ -6,16 +6,19 @@ from PyQt5.QtWidgets import QApplication, QMenu, QSystemTrayIcon
 
 import utils
 from application.app import WorkSplitTracker, WSTContext, WSTState
-from application.models import BreakActivity, WorkActivity
+from application.records import BreakActivityRecord, WorkActivityRecord
 from application.settings import SettingsNotifier
 from application.timer import CountdownTimerContext, CountdownTimerController, PriorityCallback, \
     WSTCountdownTimerIdentifier
 from gui.activity import ActivityTableModel
-from gui.windows.analytics import AnalyticsFactory, AnalyticsWindow
-from gui.windows.backlog import BacklogFactory, BacklogWindow
-from gui.windows.log import LogFactory, LogWindow
-from gui.windows.settings import SettingsFactory, SettingsWindow
-from gui.windows.timer import CountdownTimerFactory, CountdownTimerWindow
+from gui.trayicon import ProgressIconAtlas
+from gui.windows.analytics import AnalyticsFactory
+from gui.windows.backlog import BacklogFactory
+from gui.windows.diagnostics import DiagnosticsFactory
+from gui.windows.log import LogFactory
+from gui.windows.pool import WindowPool
+from gui.windows.settings import SettingsFactory
+from gui.windows.timer import CountdownTimerFactory
 
 
 class TrayModel(QObject):
@@ -23,6 +26,7 @@ class TrayModel(QObject):
         Model of the tray
     """
     timer_label_changed = pyqtSignal(str)
+    icon_changed = pyqtSignal(QIcon)
     work_action_hidden_changed = pyqtSignal(bool)
     break_action_hidden_changed = pyqtSignal(bool)
     idle_action_enabled_changed = pyqtSignal(bool)
@@ -34,7 +38,9 @@ class TrayModel(QObject):
             backlog_factory: BacklogFactory,
             analytics_factory: AnalyticsFactory,
             log_factory: LogFactory,
-            settings_factory: SettingsFactory
+            settings_factory: SettingsFactory,
+            diagnostics_factory: DiagnosticsFactory,
+            window_pool: WindowPool
     ):
         super(TrayModel, self).__init__()
 
@@ -44,15 +50,13 @@ class TrayModel(QObject):
         self._analytics_factory = analytics_factory
         self._log_factory = log_factory
         self._settings_factory = settings_factory
+        self._diagnostics_factory = diagnostics_factory
 
-        # window reference needed while window open as otherwise it is going to be garbage collected
-        self._timer_window = None
-        self._backlog_window = None
-        self._analytics_window = None
-        self._log_window = None
-        self._settings_window = None
+        # keeps the windows referenced while open, otherwise they would be garbage collected
+        self._window_pool = window_pool
 
         self._timer_label = "Timer: -"
+        self._icon = QIcon()
         
         self._work_action_hidden = False
         self._break_action_hidden = True
@@ -71,6 +75,15 @@ class TrayModel(QObject):
         self._timer_label = label
         self.timer_label_changed.emit(label)
 
+    @property
+    def icon(self) -> QIcon:
+        return self._icon
+
+    @icon.setter
+    def icon(self, icon: QIcon):
+        self._icon = icon
+        self.icon_changed.emit(icon)
+
     @property
     def work_label(self) -> str:
         return "Work"
@@ -99,6 +112,10 @@ class TrayModel(QObject):
     def settings_label(self) -> str:
         return "Settings"
 
+    @property
+    def diagnostics_label(self) -> str:
+        return "Diagnostics"
+
     @property
     def exit_label(self) -> str:
         return "Exit"
@@ -124,44 +141,12 @@ class TrayModel(QObject):
         return self._settings_factory
 
     @property
-    def timer_window(self) -> CountdownTimerWindow:
-        return self._timer_window
-
-    @timer_window.setter
-    def timer_window(self, window: CountdownTimerWindow):
-        self._timer_window = window
-
-    @property
-    def backlog_window(self) -> BacklogWindow:
-        return self._backlog_window
-
-    @backlog_window.setter
-    def backlog_window(self, window: BacklogWindow):
-        self._backlog_window = window
-
-    @property
-    def analytics_window(self) -> AnalyticsWindow:
-        return self._analytics_window
-
-    @analytics_window.setter
-    def analytics_window(self, window: AnalyticsWindow):
-        self._analytics_window = window
-
-    @property
-    def log_window(self) -> LogWindow:
-        return self._log_window
-
-    @log_window.setter
-    def log_window(self, window: LogWindow):
-        self._log_window = window
+    def diagnostics_factory(self) -> DiagnosticsFactory:
+        return self._diagnostics_factory
 
     @property
-    def settings_window(self) -> SettingsWindow:
-        return self._settings_window
-
-    @settings_window.setter
-    def settings_window(self, window: SettingsWindow):
-        self._settings_window = window
+    def window_pool(self) -> WindowPool:
+        return self._window_pool
     
     @property
     def work_action_hidden(self) -> bool:
@@ -196,15 +181,22 @@ class TrayController(QObject):
         Controller of the tray
     """
     def __init__(self, wst: WorkSplitTracker, wst_timer_controller: CountdownTimerController,
-                 activity_model: ActivityTableModel, settings_notifier: SettingsNotifier, model: TrayModel):
+                 activity_model: ActivityTableModel, settings_notifier: SettingsNotifier,
+                 icon_atlas: ProgressIconAtlas, model: TrayModel):
         super(TrayController, self).__init__()
 
         self._wst = wst
         self._wst_timer_controller = wst_timer_controller
         self._activity_model = activity_model
         self._settings_notifier = settings_notifier
+        self._icon_atlas = icon_atlas
         self._model = model
 
+        # progress shown by the tray icon, the icon is only replaced when the frame changes
+        self._icon_kind = ProgressIconAtlas.WORK
+        self._icon_frame = None
+        self._timer_seconds = 0
+
         # before state change callbacks
         self._wst.context.push_before_state_change_callback(WSTState.WORK, PriorityCallback(self._after_work, 1))
         self._wst.context.push_before_state_change_callback(WSTState.BREAK, PriorityCallback(self._after_break, 1))
@@ -228,14 +220,7 @@ class TrayController(QObject):
 
     @pyqtSlot()
     def on_timer_action_pressed(self):
-        self._model.timer_window = self._model.timer_factory.create()
-        self._model.timer_window.about_to_close.connect(self._cleanup_closed_timer_window)
-        self._model.timer_window.show()
-
-    @pyqtSlot()
-    def _cleanup_closed_timer_window(self):
-        self._model.timer_window.clean_up()
-        self._model.timer_window = None
+        self._model.window_pool.open(self._model.timer_factory)
 
     @pyqtSlot()
     def on_work_action_pressed(self):
@@ -251,48 +236,29 @@ class TrayController(QObject):
 
     @pyqtSlot()
     def on_backlog_action_pressed(self):
-        self._model.backlog_window = self._model.backlog_factory.create()
-        self._model.backlog_window.about_to_close.connect(self._cleanup_closed_backlog_window)
-        self._model.backlog_window.show()
-
-    @pyqtSlot()
-    def _cleanup_closed_backlog_window(self):
-        self._model.backlog_window = None
+        self._model.window_pool.open(self._model.backlog_factory)
 
     @pyqtSlot()
     def on_analytics_action_pressed(self):
-        self._model.analytics_window = self._model.analytics_factory.create()
-        self._model.analytics_window.about_to_close.connect(self._cleanup_closed_analytics_window)
-        self._model.analytics_window.show()
-
-    @pyqtSlot()
-    def _cleanup_closed_analytics_window(self):
-        self._model.analytics_window = None
+        self._model.window_pool.open(self._model.analytics_factory)
 
     @pyqtSlot()
     def on_log_action_pressed(self):
-        self._model.log_window = self._model.log_factory.create()
-        self._model.log_window.about_to_close.connect(self._cleanup_closed_log_window)
-        self._model.log_window.show()
-
-    @pyqtSlot()
-    def _cleanup_closed_log_window(self):
-        self._model.log_window = None
+        self._model.window_pool.open(self._model.log_factory)
 
     @pyqtSlot()
     def on_settings_action_pressed(self):
-        self._model.settings_window = self._model.settings_factory.create()
-        self._model.settings_window.about_to_close.connect(self._cleanup_closed_settings_window)
-        self._model.settings_window.show()
+        self._model.window_pool.open(self._model.settings_factory)
 
     @pyqtSlot()
-    def _cleanup_closed_settings_window(self):
-        self._model.settings_window = None
+    def on_diagnostics_action_pressed(self):
+        self._model.window_pool.open(self._model.diagnostics_factory)
 
     @pyqtSlot()
     def on_exit_action_pressed(self):
         if self._wst.context.state != WSTState.IDLE:
             self._wst.do_idle()
+        self._model.window_pool.release_all()
         self._model.app.exit()
 
     def _before_work(self, context: WSTContext):
@@ -300,6 +266,7 @@ class TrayController(QObject):
         self._model.break_action_hidden = False
         self._model.idle_action_enabled = True
         self._model.timer_label = f"Work: {utils.convert_seconds_to_time_string(context.work_time * 60)}"
+        self._start_icon_progress(ProgressIconAtlas.WORK, context.work_time * 60)
         self._create_work_activity(context)
 
     def _before_break(self, context: WSTContext):
@@ -307,6 +274,7 @@ class TrayController(QObject):
         self._model.break_action_hidden = True
         self._model.idle_action_enabled = True
         self._model.timer_label = f"Break: {utils.convert_seconds_to_time_string(context.break_time * 60)}"
+        self._start_icon_progress(ProgressIconAtlas.BREAK, context.break_time * 60)
         self._create_break_activity(context)
 
     def _before_idle(self, context: WSTContext):
@@ -314,6 +282,8 @@ class TrayController(QObject):
         self._model.break_action_hidden = True
         self._model.idle_action_enabled = False
         self._model.timer_label = "Timer: -"
+        self._icon_frame = None
+        self._model.icon = self._icon_atlas.base
 
     def _after_work(self, context: WSTContext):
         self._stop_work_activity(context)
@@ -326,12 +296,25 @@ class TrayController(QObject):
         self._model.timer_label = \
             self._model.timer_label[:prefix_index + 2] + \
             utils.convert_seconds_to_time_string(context.seconds_left)
+        self._update_icon_progress(self._timer_seconds - context.seconds_left)
+
+    def _start_icon_progress(self, kind: int, seconds: int):
+        self._icon_kind = kind
+        self._icon_frame = None
+        self._timer_seconds = seconds
+        self._update_icon_progress(0)
+
+    def _update_icon_progress(self, elapsed: int):
+        frame = self._icon_atlas.frame_index(elapsed, self._timer_seconds)
+        if frame != self._icon_frame:
+            self._icon_frame = frame
+            self._model.icon = self._icon_atlas.frame(self._icon_kind, frame)
 
     def _create_work_activity(self, context: WSTContext):
-        work_activity = WorkActivity(
+        work_activity = WorkActivityRecord(
             date=datetime.now(),
             expected_duration=self._settings_notifier.work_time * 60,
-            work_item=context.task
+            task_id=context.task.id if context.task else None
         )
         context.activity = work_activity
         self._activity_model.add_work_activity(work_activity)
@@ -342,7 +325,7 @@ class TrayController(QObject):
         context.activity = None
 
     def _create_break_activity(self, context: WSTContext):
-        break_activity = BreakActivity(
+        break_activity = BreakActivityRecord(
             date=datetime.now(),
             expected_duration=self._settings_notifier.break_time * 60
         )
@@ -382,6 +365,7 @@ class TrayView(QMenu):
         self._analytics_action = self.addAction(self._model.analytics_label)
         self._log_action = self.addAction(self._model.log_label)
         self._settings_action = self.addAction(self._model.settings_label)
+        self._diagnostics_action = self.addAction(self._model.diagnostics_label)
         self.addSeparator()
         self._exit_action = self.addAction(self._model.exit_label)
 
@@ -402,6 +386,7 @@ class TrayView(QMenu):
         self._analytics_action.triggered.connect(self._controller.on_analytics_action_pressed)
         self._log_action.triggered.connect(self._controller.on_log_action_pressed)
         self._settings_action.triggered.connect(self._controller.on_settings_action_pressed)
+        self._diagnostics_action.triggered.connect(self._controller.on_diagnostics_action_pressed)
         self._exit_action.triggered.connect(self._controller.on_exit_action_pressed)
 
         self._model.timer_label_changed.connect(self._on_timer_label_changed)
@@ -441,9 +426,11 @@ class Tray(QSystemTrayIcon):
             backlog_factory: BacklogFactory,
             analytics_factory: AnalyticsFactory,
             log_factory: LogFactory,
-            settings_factory: SettingsFactory
+            settings_factory: SettingsFactory,
+            diagnostics_factory: DiagnosticsFactory,
+            window_pool: WindowPool
     ):
-        super(Tray, self).__init__(QIcon(utils.resource_provider.image("tray_icon.png")), app)
+        super(Tray, self).__init__(app)
 
         self._model = TrayModel(
             app=app,
@@ -451,8 +438,15 @@ class Tray(QSystemTrayIcon):
             backlog_factory=backlog_factory,
             analytics_factory=analytics_factory,
             log_factory=log_factory,
-            settings_factory=settings_factory
+            settings_factory=settings_factory,
+            diagnostics_factory=diagnostics_factory,
+            window_pool=window_pool
         )
-        self._controller = TrayController(wst, wst_timer_controller, activity_model, settings_notifier, self._model)
+        self._icon_atlas = ProgressIconAtlas(utils.resource_provider.pixmap("tray_icon.png"))
+        self._controller = TrayController(wst, wst_timer_controller, activity_model, settings_notifier,
+                                          self._icon_atlas, self._model)
         self._view = TrayView(self._controller, self._model)
         self.setContextMenu(self._view)
+
+        self.setIcon(self._model.icon)
+        self._model.icon_changed.connect(self.setIcon)
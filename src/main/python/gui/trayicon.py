@@ -0,0 +1,60 @@
+from typing import List
+
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QColor, QIcon, QPainter, QPen, QPixmap
+
+_SIZE = 64
+_RING_WIDTH = 8
+_WORK_COLOR = QColor(214, 69, 65)
+_BREAK_COLOR = QColor(46, 160, 67)
+_TRACK_COLOR = QColor(128, 128, 128, 96)
+
+
+class ProgressIconAtlas:
+    """
+        Tray icons showing the progress of the work or break timer as a ring around the app icon.
+        All frames are rendered once up front, the tray only picks a frame and never paints while the timer runs.
+    """
+    WORK = 0
+    BREAK = 1
+
+    def __init__(self, base: QPixmap, steps: int = 60):
+        self._steps = steps
+        self._base = QIcon(base)
+        self._frames = [self._render_frames(base, color) for color in (_WORK_COLOR, _BREAK_COLOR)]
+
+    @property
+    def base(self) -> QIcon:
+        return self._base
+
+    def frame_index(self, elapsed: int, total: int) -> int:
+        if total <= 0:
+            return self._steps
+        return min(max(elapsed * self._steps // total, 0), self._steps)
+
+    def frame(self, kind: int, index: int) -> QIcon:
+        return self._frames[kind][index]
+
+    def _render_frames(self, base: QPixmap, color: QColor) -> List[QIcon]:
+        icon = base.scaled(_SIZE - 4 * _RING_WIDTH, _SIZE - 4 * _RING_WIDTH, Qt.AspectRatioMode.KeepAspectRatio,
+                           Qt.TransformationMode.SmoothTransformation)
+        ring = QRectF(_RING_WIDTH / 2, _RING_WIDTH / 2, _SIZE - _RING_WIDTH, _SIZE - _RING_WIDTH)
+        frames = []
+
+        for step in range(self._steps + 1):
+            pixmap = QPixmap(_SIZE, _SIZE)
+            pixmap.fill(Qt.GlobalColor.transparent)
+
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.drawPixmap((_SIZE - icon.width()) // 2, (_SIZE - icon.height()) // 2, icon)
+            painter.setPen(QPen(_TRACK_COLOR, _RING_WIDTH))
+            painter.drawEllipse(ring)
+            # clockwise from twelve o'clock, angles are in 1/16 degree
+            painter.setPen(QPen(color, _RING_WIDTH, cap=Qt.PenCapStyle.FlatCap))
+            painter.drawArc(ring, 90 * 16, -360 * 16 * step // self._steps)
+            painter.end()
+
+            frames.append(QIcon(pixmap))
+
+        return frames
@@ -0,0 +1,144 @@
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from types import FrameType
+from typing import List
+
+from PyQt5.QtCore import pyqtSlot, QObject, Qt, QTimer
+
+from application.diagnostics import format_stack, LatencyHistogram, Stall
+
+logger = logging.getLogger(__name__)
+
+
+def _depth(frame: FrameType) -> int:
+    depth = 0
+    while frame is not None:
+        depth = depth + 1
+        frame = frame.f_back
+    return depth
+
+
+class EventLoopWatchdog(QObject):
+    """
+        Measures the latency of the Qt event loop with a high-frequency probe timer.
+        A probe firing later than the threshold is recorded as a stall, together with the stacks of the GUI thread a
+        sampling thread took while the probe was overdue. A probe fired by a nested event loop, e.g. of a modal exec(),
+        records the code that started the loop instead.
+        Intervals and the threshold are in milliseconds.
+    """
+    def __init__(self, interval: int = 50, threshold: int = 100, sample_interval: int = 20, max_stalls: int = 100,
+                 parent: QObject = None):
+        super().__init__(parent)
+
+        self._interval = interval / 1000
+        self._threshold = threshold / 1000
+        self._sample_interval = sample_interval / 1000
+        self._gui_thread = threading.get_ident()
+
+        self._lag = LatencyHistogram()
+        self._stalls = deque(maxlen=max_stalls)
+
+        # time the next probe is due, written by the GUI thread and read by the sampling thread
+        self._due = 0.0
+        self._samples = Counter()
+        self._samples_lock = threading.Lock()
+        self._sampler_stopped = None
+
+        # stack depth of the probe called by the main event loop, and start and stack of a running nested loop
+        self._loop_depth = None
+        self._nested_loop = None
+
+        self._probe = QTimer(self)
+        self._probe.setTimerType(Qt.TimerType.PreciseTimer)
+        self._probe.setInterval(interval)
+        self._probe.timeout.connect(self._on_probe)
+
+    @property
+    def enabled(self) -> bool:
+        return self._probe.isActive()
+
+    @enabled.setter
+    def enabled(self, enabled: bool):
+        if enabled == self.enabled:
+            return
+
+        if enabled:
+            self._due = time.perf_counter() + self._interval
+            self._sampler_stopped = threading.Event()
+            threading.Thread(target=self._sample, args=(self._sampler_stopped,), name="watchdog", daemon=True).start()
+            self._probe.start()
+        else:
+            self._probe.stop()
+            self._sampler_stopped.set()
+            self._nested_loop = None
+
+    @property
+    def threshold(self) -> int:
+        return int(self._threshold * 1000)
+
+    @property
+    def lag(self) -> LatencyHistogram:
+        return self._lag
+
+    @property
+    def stalls(self) -> List[Stall]:
+        return list(self._stalls)
+
+    def clear(self):
+        self._lag = LatencyHistogram()
+        self._stalls.clear()
+
+    def to_dict(self) -> dict:
+        return {
+            'interval_ms': int(self._interval * 1000),
+            'threshold_ms': self.threshold,
+            'lag': self._lag.to_dict(),
+            'stalls': [stall.to_dict() for stall in self._stalls]
+        }
+
+    def _sample(self, stopped: threading.Event):
+        while not stopped.wait(self._sample_interval):
+            if time.perf_counter() - self._due < self._threshold:
+                continue
+
+            frame = sys._current_frames().get(self._gui_thread)
+            if frame is None:
+                continue
+            stack = format_stack(frame)
+            with self._samples_lock:
+                self._samples[stack] = self._samples[stack] + 1
+
+    @pyqtSlot()
+    def _on_probe(self):
+        now = time.perf_counter()
+        lag = max(now - self._due, 0.0)
+        self._due = now + self._interval
+        self._lag.record(int(lag * 1000000))
+
+        with self._samples_lock:
+            samples, self._samples = self._samples, Counter()
+        if lag >= self._threshold:
+            stall = Stall(Stall.STALL, datetime.now() - timedelta(seconds=lag), int(lag * 1000),
+                          [(count, stack) for stack, count in samples.most_common()])
+            self._stalls.append(stall)
+            logger.warning("event loop stalled for %d ms at %s", stall.duration, stall.location or "unknown")
+
+        self._check_nested_loop(sys._getframe(1), now)
+
+    def _check_nested_loop(self, frame: FrameType, now: float):
+        # the probe is called from C++, its Python caller is the frame that started the running event loop
+        depth = _depth(frame)
+        if self._loop_depth is None or depth < self._loop_depth:
+            self._loop_depth = depth
+
+        if depth > self._loop_depth:
+            if self._nested_loop is None:
+                self._nested_loop = (datetime.now(), now, format_stack(frame))
+        elif self._nested_loop is not None:
+            started, start, stack = self._nested_loop
+            self._nested_loop = None
+            self._stalls.append(Stall(Stall.NESTED_LOOP, started, int((now - start) * 1000), [(1, stack)]))
@@ -1,9 +1,9 @@
 from abc import abstractmethod, ABC
 
+from PyQt5 import QtGui
 from PyQt5.QtCore import pyqtSignal, pyqtSlot, QModelIndex, QObject, Qt
 from PyQt5.QtWidgets import QGridLayout, QHBoxLayout, QLabel, QSpinBox, QVBoxLayout, QWidget
 
-from application.models import BreakActivity, WorkActivity
 from gui.activity import ActivityTableModel
 from gui.task import TaskListModel
 from gui.windows.mainwindow import AbstractWindow
@@ -119,50 +119,51 @@ class AnalyticsController(QObject):
         self._model = model
         self._task_model = task_model
         self._activity_model = activity_model
+        self._paused = False
+        self._stale = False
 
         self._task_model.dataChanged.connect(self._on_task_data_changed)
         self._task_model.rowsInserted.connect(self._on_task_data_inserted)
         self._task_model.rowsRemoved.connect(self._on_task_data_removed)
+        self._task_model.modelReset.connect(self._on_task_model_reset)
         self._activity_model.dataChanged.connect(self._on_activity_data_changed)
         self._activity_model.rowsInserted.connect(self._on_activity_data_inserted)
 
-        self._init_model()
+        self.refresh()
+
+    @property
+    def paused(self) -> bool:
+        """
+            A paused controller doesn't count the changed activities and tasks, it catches up once it is resumed
+        """
+        return self._paused
+
+    @paused.setter
+    def paused(self, paused: bool):
+        self._paused = paused
+        if not paused and self._stale:
+            self.refresh()
 
     def _on_activity_model_change(self):
-        work_activity_count = self._calc_work_activity_count()
-        break_activity_count = self._activity_model.rowCount() - work_activity_count
+        if self._paused:
+            self._stale = True
+            return
 
-        self._model.work_activity_count = work_activity_count
-        self._model.break_activity_count = break_activity_count
-        self._model.work_time_diff = self._calc_time_diff(WorkActivity)
-        self._model.break_time_diff = self._calc_time_diff(BreakActivity)
+        self._model.work_activity_count = self._activity_model.activity_count(work=True)
+        self._model.break_activity_count = self._activity_model.activity_count(work=False)
+        self._model.work_time_diff = self._activity_model.time_diff(work=True)
+        self._model.break_time_diff = self._activity_model.time_diff(work=False)
 
     def _on_task_model_change(self):
+        if self._paused:
+            self._stale = True
+            return
+
         completed_tasks_count = self._calc_task_completed_count()
         left_tasks_count = self._task_model.rowCount() - 1 - completed_tasks_count
         self._model.completed_tasks_count = completed_tasks_count
         self._model.left_tasks_count = left_tasks_count
 
-    def _calc_time_diff(self, activity_type) -> int:
-        diff = 0
-
-        for index in range(self._activity_model.rowCount()):
-            activity = self._activity_model.index(index, 0).data(Qt.ItemDataRole.UserRole)
-            if isinstance(activity, activity_type) and activity.duration:
-                diff = diff + activity.duration - activity.expected_duration
-
-        return diff
-
-    def _calc_work_activity_count(self) -> int:
-        count = 0
-
-        for index in range(self._activity_model.rowCount()):
-            activity = self._activity_model.index(index, 0).data(Qt.ItemDataRole.UserRole)
-            if isinstance(activity, WorkActivity):
-                count = count + 1
-
-        return count
-
     def _calc_task_completed_count(self) -> int:
         completed_sum = 0
 
@@ -193,7 +194,12 @@ class AnalyticsController(QObject):
     def _on_task_data_removed(self, parent: QModelIndex, first: int, last: int):
         self._on_task_model_change()
 
-    def _init_model(self):
+    @pyqtSlot()
+    def _on_task_model_reset(self):
+        self._on_task_model_change()
+
+    def refresh(self):
+        self._stale = False
         self._on_activity_model_change()
         self._on_task_model_change()
 
@@ -336,6 +342,14 @@ class AnalyticsWindow(AbstractWindow):
 
         self._center()
 
+    def reopen(self):
+        self._controller.paused = False
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        # a closed window kept by the window pool doesn't recount the activities and tasks until it is reopened
+        self._controller.paused = True
+        super().closeEvent(event)
+
 
 class AnalyticsFactory(ABC):
     @abstractmethod
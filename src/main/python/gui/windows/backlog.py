@@ -1,63 +1,53 @@
 from abc import ABC, abstractmethod
+from typing import List
 
-from PyQt5.QtCore import pyqtSlot, pyqtSignal, QItemSelection, QItemSelectionModel, QModelIndex, QObject, \
-    QSortFilterProxyModel, Qt
+from PyQt5 import QtGui
+from PyQt5.QtCore import pyqtSlot, pyqtSignal, QAbstractListModel, QItemSelection, QItemSelectionModel, QModelIndex, \
+    QObject, Qt
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QHBoxLayout, QListView, QPushButton, QVBoxLayout, QWidget
+from PyQt5.QtWidgets import QAbstractItemView, QHBoxLayout, QLineEdit, QListView, QPushButton, QVBoxLayout, QWidget
 
 import utils
-from application.models import Task
+from application.records import TaskRecord
 from gui.dialogs.confirm import ConfirmDialogFactory
-from gui.dialogs.task import CreateEditTaskDialogFactory
-from gui.task import TaskListModel
+from gui.dialogs.task import CreateEditTaskDialogFactory, PriorityDialogFactory
+from gui.task import TaskListModel, TaskSearchModel
 from gui.windows.mainwindow import AbstractWindow
 
 
-class BacklogProxyModel(QSortFilterProxyModel):
-    """
-        Proxy Model used to display, sort and select the tasks provided by the TaskListModel
-    """
-    def __init__(self, default_task: Task):
-        super().__init__()
-        self._default = default_task
-        self.setFilterRole(Qt.ItemDataRole.UserRole)
-
-    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
-        data = self.sourceModel().index(source_row, 0, source_parent).data(Qt.ItemDataRole.UserRole)
-        return data != self._default and not data.completed
-
-
 class BacklogModel(QObject):
     """
         Model of the backlog window
     """
     remove_enabled_changed = pyqtSignal(bool)
     mark_enabled_changed = pyqtSignal(bool)
+    priority_enabled_changed = pyqtSignal(bool)
+    task_list_model_changed = pyqtSignal()
+    SEARCH_LIMIT = 200
 
     def __init__(self, create_edit_task_dialog_factory: CreateEditTaskDialogFactory,
-                 confirm_dialog_factory: ConfirmDialogFactory, task_model: TaskListModel):
+                 confirm_dialog_factory: ConfirmDialogFactory, priority_dialog_factory: PriorityDialogFactory,
+                 task_model: TaskListModel):
 
         super(BacklogModel, self).__init__()
 
         self._create_edit_dialog_factory = create_edit_task_dialog_factory
         self._confirm_dialog_factory = confirm_dialog_factory
+        self._priority_dialog_factory = priority_dialog_factory
         self._task_model = task_model
 
-        self._add_icon = QIcon(utils.resource_provider.image("211878_plus_icon.png"))
-        self._remove_icon = QIcon(utils.resource_provider.image("211864_minus_icon.png"))
-        self._mark_icon = QIcon(utils.resource_provider.image("211643_checkmark_round_icon.png"))
+        self._add_icon = utils.resource_provider.icon("211878_plus_icon.png")
+        self._remove_icon = utils.resource_provider.icon("211864_minus_icon.png")
+        self._mark_icon = utils.resource_provider.icon("211643_checkmark_round_icon.png")
 
-        self._proxy_task_model = BacklogProxyModel(task_model.DEFAULT)
-        self._proxy_task_model.setSortRole(self._task_model.SORT_NAME_ROLE)
-        self._proxy_task_model.setSourceModel(self._task_model)
-        self._proxy_task_model.setDynamicSortFilter(True)
-        self._proxy_task_model.setSortCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self._proxy_task_model.sort(0, Qt.SortOrder.AscendingOrder)
+        self._search_model = TaskSearchModel(task_model, self.SEARCH_LIMIT, task_model.full_text_search, self)
+        self._search_query = ""
 
         self._selection_model = None
 
         self._remove_enabled = False
         self._mark_enabled = False
+        self._priority_enabled = False
 
     @property
     def add_icon(self) -> QIcon:
@@ -72,8 +62,27 @@ class BacklogModel(QObject):
         return self._mark_icon
 
     @property
-    def proxy_task_model(self):
-        return self._proxy_task_model
+    def priority_label(self) -> str:
+        return "Priority"
+
+    @property
+    def import_label(self) -> str:
+        return "Import"
+
+    @property
+    def search_placeholder(self) -> str:
+        return "Search tasks"
+
+    @property
+    def search_model(self) -> TaskSearchModel:
+        return self._search_model
+
+    @property
+    def task_list_model(self) -> QAbstractListModel:
+        # all open tasks by name or, while searching, the best ranked matches
+        if self._search_query.strip():
+            return self._search_model
+        return self._task_model.open_tasks_by_name
 
     @property
     def selection_model(self):
@@ -101,6 +110,27 @@ class BacklogModel(QObject):
         self._mark_enabled = enabled
         self.mark_enabled_changed.emit(enabled)
 
+    @property
+    def priority_enabled(self) -> bool:
+        return self._priority_enabled
+
+    @priority_enabled.setter
+    def priority_enabled(self, enabled: bool):
+        self._priority_enabled = enabled
+        self.priority_enabled_changed.emit(enabled)
+
+    def search(self, query: str):
+        previous_model = self.task_list_model
+        self._search_query = query
+        self._search_model.set_query(query)
+
+        # changing the query resets the selection without a selection change
+        self.mark_enabled = False
+        self.remove_enabled = False
+        self.priority_enabled = False
+        if self.task_list_model is not previous_model:
+            self.task_list_model_changed.emit()
+
     def open_create_dialog(self):
         dialog = self._create_edit_dialog_factory.create_dialog()
         if dialog.exec():
@@ -108,39 +138,64 @@ class BacklogModel(QObject):
 
         self.selection_model.clear()
 
+    def open_import_dialog(self):
+        dialog = self._create_edit_dialog_factory.import_dialog()
+        if dialog.exec():
+            self._task_model.insert_tasks(self._task_model.rowCount(), dialog.tasks)
+
+        self.selection_model.clear()
+
     def open_edit_dialog(self, index: QModelIndex):
-        index = self._proxy_task_model.mapToSource(index)
+        index = self._task_model.index_of(index.data(Qt.ItemDataRole.UserRole))
         dialog = self._create_edit_dialog_factory.edit_dialog(index.data(Qt.ItemDataRole.UserRole))
         if dialog.exec():
             self._task_model.setData(index, dialog.task)
 
     def open_remove_confirm_dialog(self):
-        index = self._get_current_selection_source()
-        task = index.data(Qt.ItemDataRole.UserRole)
+        tasks = self._get_selected_tasks()
         self._selection_model.clear()
         dialog = self._confirm_dialog_factory.create(
             title="Remove task",
-            message=f"Are you sure you want to remove {task.name}?"
+            message=f"Are you sure you want to remove {self._describe(tasks)}?"
         )
 
-        if dialog.exec():
-            self._task_model.remove_task(index)
+        if not dialog.exec():
+            return
+        if len(tasks) == 1:
+            self._task_model.remove_task(self._task_model.index_of(tasks[0]))
+        else:
+            self._task_model.remove_tasks(tasks)
 
     def open_mark_confirm_dialog(self):
-        index = self._get_current_selection_source()
-        task = index.data(Qt.ItemDataRole.UserRole)
+        tasks = self._get_selected_tasks()
         self._selection_model.clear()
         dialog = self._confirm_dialog_factory.create(
             title="Mark task as completed",
-            message=f"Are you sure you want to mark {task.name} as completed?"
+            message=f"Are you sure you want to mark {self._describe(tasks)} as completed?"
         )
 
+        if not dialog.exec():
+            return
+        if len(tasks) == 1:
+            tasks[0].completed = True
+            self._task_model.setData(index=self._task_model.index_of(tasks[0]), value=tasks[0])
+        else:
+            self._task_model.complete_tasks(tasks)
+
+    def open_priority_dialog(self):
+        tasks = self._get_selected_tasks()
+        dialog = self._priority_dialog_factory.create(len(tasks))
+
         if dialog.exec():
-            task.completed = True
-            self._task_model.setData(index=index, value=task)
+            self._selection_model.clear()
+            self._task_model.update_priority(tasks, dialog.priority)
+
+    @staticmethod
+    def _describe(tasks: List[TaskRecord]) -> str:
+        return tasks[0].name if len(tasks) == 1 else f"{len(tasks)} tasks"
 
-    def _get_current_selection_source(self) -> QModelIndex:
-        return self._proxy_task_model.mapToSource(self._selection_model.currentIndex())
+    def _get_selected_tasks(self) -> List[TaskRecord]:
+        return [index.data(Qt.ItemDataRole.UserRole) for index in self._selection_model.selectedIndexes()]
 
 
 class BacklogController(QObject):
@@ -155,10 +210,18 @@ class BacklogController(QObject):
     def on_add_clicked(self):
         self._model.open_create_dialog()
 
+    @pyqtSlot()
+    def on_import_clicked(self):
+        self._model.open_import_dialog()
+
     @pyqtSlot(QModelIndex)
     def on_edit_clicked(self, index: QModelIndex):
         self._model.open_edit_dialog(index)
 
+    @pyqtSlot(str)
+    def on_search_changed(self, query: str):
+        self._model.search(query)
+
     @pyqtSlot()
     def on_remove_clicked(self):
         self._model.open_remove_confirm_dialog()
@@ -167,15 +230,16 @@ class BacklogController(QObject):
     def on_mark_clicked(self):
         self._model.open_mark_confirm_dialog()
 
+    @pyqtSlot()
+    def on_priority_clicked(self):
+        self._model.open_priority_dialog()
+
     @pyqtSlot(QItemSelection, QItemSelection)
     def on_select_changed(self, current_selection, previous_selection):
-        if len(current_selection) == 1 and len(previous_selection) == 0:
-            self._model.mark_enabled = True
-            self._model.remove_enabled = True
-
-        if len(current_selection) == 0 and len(previous_selection) == 1:
-            self._model.mark_enabled = False
-            self._model.remove_enabled = False
+        has_selection = self._model.selection_model.hasSelection()
+        self._model.mark_enabled = has_selection
+        self._model.remove_enabled = has_selection
+        self._model.priority_enabled = has_selection
 
 
 class BacklogView(QWidget):
@@ -191,8 +255,14 @@ class BacklogView(QWidget):
         self._add_button = QPushButton(icon=self._model.add_icon, parent=self)
         self._remove_button = QPushButton(icon=self._model.remove_icon, parent=self)
         self._mark_button = QPushButton(icon=self._model.mark_icon, parent=self)
+        self._priority_button = QPushButton(text=self._model.priority_label, parent=self)
+        self._import_button = QPushButton(text=self._model.import_label, parent=self)
 
+        self._search = QLineEdit(parent=self)
         self._task_view = QListView(self)
+        # all rows have the same height, so only the visible ones are laid out
+        self._task_view.setUniformItemSizes(True)
+        self._task_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
 
         self._init_state()
         self._init_bindings()
@@ -201,31 +271,45 @@ class BacklogView(QWidget):
     def _init_state(self):
         self._remove_button.setEnabled(self._model.remove_enabled)
         self._mark_button.setEnabled(self._model.mark_enabled)
+        self._priority_button.setEnabled(self._model.priority_enabled)
 
-        self._task_view.setModel(self._model.proxy_task_model)
+        self._search.setPlaceholderText(self._model.search_placeholder)
+        self._search.setClearButtonEnabled(True)
+        self._task_view.setModel(self._model.task_list_model)
         self._model.selection_model = self._task_view.selectionModel()
 
     def _init_layout(self):
         layout = QHBoxLayout(self)
+        list_layout = QVBoxLayout()
         list_button_layout = QVBoxLayout()
 
         list_button_layout.addWidget(self._add_button)
         list_button_layout.addWidget(self._remove_button)
         list_button_layout.addWidget(self._mark_button)
+        list_button_layout.addWidget(self._priority_button)
+        list_button_layout.addWidget(self._import_button)
         list_button_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
 
-        layout.addWidget(self._task_view)
+        list_layout.addWidget(self._search)
+        list_layout.addWidget(self._task_view)
+
+        layout.addLayout(list_layout)
         layout.addLayout(list_button_layout)
 
     def _init_bindings(self):
         self._add_button.pressed.connect(self._controller.on_add_clicked)
         self._remove_button.pressed.connect(self._controller.on_remove_clicked)
         self._mark_button.pressed.connect(self._controller.on_mark_clicked)
+        self._priority_button.pressed.connect(self._controller.on_priority_clicked)
+        self._import_button.pressed.connect(self._controller.on_import_clicked)
         self._task_view.doubleClicked.connect(self._controller.on_edit_clicked)
         self._task_view.selectionModel().selectionChanged.connect(self._controller.on_select_changed)
+        self._search.textEdited.connect(self._controller.on_search_changed)
 
         self._model.remove_enabled_changed.connect(self._on_remove_enabled_changed)
         self._model.mark_enabled_changed.connect(self._on_mark_enabled_changed)
+        self._model.priority_enabled_changed.connect(self._on_priority_enabled_changed)
+        self._model.task_list_model_changed.connect(self._on_task_list_model_changed)
 
     @pyqtSlot(bool)
     def _on_remove_enabled_changed(self, enabled: bool):
@@ -235,6 +319,20 @@ class BacklogView(QWidget):
     def _on_mark_enabled_changed(self, enabled: bool):
         self._mark_button.setEnabled(enabled)
 
+    @pyqtSlot(bool)
+    def _on_priority_enabled_changed(self, enabled: bool):
+        self._priority_button.setEnabled(enabled)
+
+    @pyqtSlot()
+    def _on_task_list_model_changed(self):
+        # setting a model replaces the selection model of the view
+        previous_selection_model = self._task_view.selectionModel()
+        self._task_view.setModel(self._model.task_list_model)
+        previous_selection_model.deleteLater()
+
+        self._model.selection_model = self._task_view.selectionModel()
+        self._task_view.selectionModel().selectionChanged.connect(self._controller.on_select_changed)
+
 
 class BacklogWindow(AbstractWindow):
     """
@@ -242,10 +340,12 @@ class BacklogWindow(AbstractWindow):
         The window implements the MVC pattern.
     """
     def __init__(self, create_edit_task_dialog_factory: CreateEditTaskDialogFactory,
-                 confirm_dialog_factory: ConfirmDialogFactory, task_model: TaskListModel):
+                 confirm_dialog_factory: ConfirmDialogFactory, priority_dialog_factory: PriorityDialogFactory,
+                 task_model: TaskListModel):
         super(BacklogWindow, self).__init__()
 
-        self._model = BacklogModel(create_edit_task_dialog_factory, confirm_dialog_factory, task_model)
+        self._model = BacklogModel(create_edit_task_dialog_factory, confirm_dialog_factory, priority_dialog_factory,
+                                   task_model)
         self._controller = BacklogController(self._model)
         self._view = BacklogView(self._controller, self._model)
 
@@ -255,6 +355,14 @@ class BacklogWindow(AbstractWindow):
 
         self._center()
 
+    def reopen(self):
+        self._model.search_model.paused = False
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        # a closed window kept by the window pool doesn't run the full text search until it is reopened
+        self._model.search_model.paused = True
+        super().closeEvent(event)
+
 
 class BacklogFactory(ABC):
     @abstractmethod
@@ -264,10 +372,13 @@ class BacklogFactory(ABC):
 
 class BacklogFactoryImpl(BacklogFactory):
     def __init__(self, create_edit_task_dialog_factory: CreateEditTaskDialogFactory,
-                 confirm_dialog_factory: ConfirmDialogFactory, task_model: TaskListModel):
+                 confirm_dialog_factory: ConfirmDialogFactory, priority_dialog_factory: PriorityDialogFactory,
+                 task_model: TaskListModel):
         self._task_model = task_model
         self._create_edit_task_dialog_factory = create_edit_task_dialog_factory
         self._confirm_dialog_factory = confirm_dialog_factory
+        self._priority_dialog_factory = priority_dialog_factory
 
     def create(self) -> BacklogWindow:
-        return BacklogWindow(self._create_edit_task_dialog_factory, self._confirm_dialog_factory, self._task_model)
+        return BacklogWindow(self._create_edit_task_dialog_factory, self._confirm_dialog_factory,
+                             self._priority_dialog_factory, self._task_model)
@@ -0,0 +1,285 @@
+import json
+from abc import ABC, abstractmethod
+from typing import List
+
+from PyQt5 import QtGui
+from PyQt5.QtCore import pyqtSlot, QAbstractTableModel, QItemSelection, QModelIndex, QObject, Qt, QTimer
+from PyQt5.QtWidgets import QAbstractItemView, QCheckBox, QFileDialog, QHBoxLayout, QHeaderView, QLabel, \
+    QPlainTextEdit, QPushButton, QSplitter, QTableView, QTabWidget, QVBoxLayout, QWidget
+
+from application.diagnostics import CallbackProfiler
+from db import QueryThreadMonitor
+from gui.watchdog import EventLoopWatchdog
+from gui.windows.mainwindow import AbstractWindow
+
+HORIZONTAL_HEADER = ['Callback', 'Calls', 'Mean', 'p50', 'p90', 'p99', 'Max']
+STALL_HEADER = ['Started', 'Kind', 'Duration', 'Location']
+QUERY_HEADER = ['Call site', 'Statement', 'Calls', 'Total', 'Max']
+
+
+def _milliseconds(microseconds: float) -> str:
+    return f"{microseconds / 1000:.2f} ms"
+
+
+class _ReportTableModel(QAbstractTableModel):
+    """
+        Read-only table of strings, the first column is left aligned, all others right aligned
+    """
+    def __init__(self, header: List[str], parent: QObject = None):
+        super().__init__(parent)
+        self._header = header
+        self._rows = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self._header)
+
+    def data(self, index: QModelIndex, role: int = 0):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() > 0:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        return None
+
+    def headerData(self, col: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self._header[col]
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+
+
+class CallbackLatencyModel(_ReportTableModel):
+    """
+        Latency statistics of the profiled callbacks, one row per callback
+    """
+    def __init__(self, profiler: CallbackProfiler, parent: QObject = None):
+        super().__init__(HORIZONTAL_HEADER, parent)
+        self._profiler = profiler
+        self.refresh()
+
+    @pyqtSlot()
+    def refresh(self):
+        self.beginResetModel()
+        self._rows = []
+        for label in self._profiler.labels():
+            histogram = self._profiler.histogram(label)
+            self._rows.append([label, str(histogram.count), _milliseconds(histogram.mean),
+                               _milliseconds(histogram.percentile(50)), _milliseconds(histogram.percentile(90)),
+                               _milliseconds(histogram.percentile(99)), _milliseconds(histogram.max)])
+        self.endResetModel()
+
+
+class StallModel(_ReportTableModel):
+    """
+        Stalls and nested event loops recorded by the watchdog, latest first.
+        The details of a row are its sampled stacks.
+    """
+    def __init__(self, watchdog: EventLoopWatchdog, parent: QObject = None):
+        super().__init__(STALL_HEADER, parent)
+        self._watchdog = watchdog
+        self._stalls = []
+        self.refresh()
+
+    def details(self, row: int) -> str:
+        stacks = self._stalls[row].stacks
+        if not stacks:
+            return "No stack sampled, the stall was shorter than the sampling interval"
+        return "\n\n".join(f"{samples} sample(s):\n" + "\n".join(stack) for samples, stack in stacks)
+
+    @pyqtSlot()
+    def refresh(self):
+        self.beginResetModel()
+        self._stalls = list(reversed(self._watchdog.stalls))
+        self._rows = [[stall.started.strftime("%H:%M:%S"), stall.kind, f"{stall.duration} ms", stall.location]
+                      for stall in self._stalls]
+        self.endResetModel()
+
+
+class QueryModel(_ReportTableModel):
+    """
+        Statements executed on the GUI thread grouped by call site, most time first.
+        The details of a row are the stack of the latest execution.
+    """
+    def __init__(self, monitor: QueryThreadMonitor, parent: QObject = None):
+        super().__init__(QUERY_HEADER, parent)
+        self._monitor = monitor
+        self._stacks = []
+        self.refresh()
+
+    def details(self, row: int) -> str:
+        return "\n".join(self._stacks[row])
+
+    @pyqtSlot()
+    def refresh(self):
+        self.beginResetModel()
+        self._rows = []
+        self._stacks = []
+        for call_site, statement, count, total, maximum, stack in self._monitor.queries():
+            self._rows.append([call_site, statement, str(count), _milliseconds(total * 1000000),
+                               _milliseconds(maximum * 1000000)])
+            self._stacks.append(stack)
+        self.endResetModel()
+
+
+class DiagnosticsWindow(AbstractWindow):
+    """
+        Window showing the latencies of the state change, tick and alarm callbacks, the stalls of the event loop and
+        the database queries made on the GUI thread
+    """
+    REFRESH_INTERVAL = 1000
+
+    def __init__(self, profiler: CallbackProfiler, watchdog: EventLoopWatchdog, query_monitor: QueryThreadMonitor):
+        super(DiagnosticsWindow, self).__init__()
+
+        self._profiler = profiler
+        self._watchdog = watchdog
+        self._query_monitor = query_monitor
+        self._latency_model = CallbackLatencyModel(profiler, self)
+        self._stall_model = StallModel(watchdog, self)
+        self._query_model = QueryModel(query_monitor, self)
+
+        self._enabled_field = QCheckBox("Record callback latencies", self)
+        self._enabled_field.setChecked(profiler.enabled)
+        self._watchdog_field = QCheckBox("Watch event loop", self)
+        self._watchdog_field.setChecked(watchdog.enabled)
+        self._clear_button = QPushButton(text="Clear", parent=self)
+        self._dump_button = QPushButton(text="Save as JSON", parent=self)
+
+        self.latency_view = self._create_view(self._latency_model)
+        self.latency_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.stall_view = self._create_view(self._stall_model)
+        self.stall_view.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.query_view = self._create_view(self._query_model)
+        self.query_view.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self._lag_label = QLabel(self)
+
+        # refreshes only while the window is shown
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(self.REFRESH_INTERVAL)
+        self._refresh_timer.timeout.connect(self._refresh)
+
+        self._enabled_field.toggled.connect(self._on_enabled_toggled)
+        self._watchdog_field.toggled.connect(self._on_watchdog_toggled)
+        self._clear_button.pressed.connect(self._on_clear_pressed)
+        self._dump_button.pressed.connect(self._on_dump_pressed)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self._enabled_field)
+        button_layout.addWidget(self._watchdog_field)
+        button_layout.addStretch()
+        button_layout.addWidget(self._clear_button)
+        button_layout.addWidget(self._dump_button)
+
+        stall_tab = QWidget(self)
+        stall_layout = QVBoxLayout(stall_tab)
+        stall_layout.addWidget(self._lag_label)
+        stall_layout.addWidget(self._create_details_splitter(self.stall_view, self._stall_model))
+
+        tabs = QTabWidget(self)
+        tabs.addTab(self.latency_view, "Callbacks")
+        tabs.addTab(stall_tab, "Event loop")
+        tabs.addTab(self._create_details_splitter(self.query_view, self._query_model), "GUI thread queries")
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(button_layout)
+        layout.addWidget(tabs)
+
+        self.resize(800, 500)
+        self._center()
+
+    def showEvent(self, event: QtGui.QShowEvent) -> None:
+        self._refresh()
+        self._refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event: QtGui.QHideEvent) -> None:
+        self._refresh_timer.stop()
+        super().hideEvent(event)
+
+    @staticmethod
+    def _create_view(model: QAbstractTableModel) -> QTableView:
+        view = QTableView()
+        view.verticalHeader().hide()
+        view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        view.setModel(model)
+        return view
+
+    def _create_details_splitter(self, view: QTableView, model: _ReportTableModel) -> QSplitter:
+        details = QPlainTextEdit(self)
+        details.setReadOnly(True)
+        details.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+
+        def on_selection_changed(selected: QItemSelection, _: QItemSelection):
+            indexes = selected.indexes()
+            details.setPlainText(model.details(indexes[0].row()) if indexes else "")
+
+        view.selectionModel().selectionChanged.connect(on_selection_changed)
+        model.modelReset.connect(details.clear)
+
+        splitter = QSplitter(Qt.Orientation.Vertical, self)
+        splitter.addWidget(view)
+        splitter.addWidget(details)
+        return splitter
+
+    @pyqtSlot()
+    def _refresh(self):
+        self._latency_model.refresh()
+        # the selected stack would be lost by a refresh, the event loop and query tabs only change while watching
+        if self._watchdog.enabled:
+            self._stall_model.refresh()
+            self._query_model.refresh()
+        self._lag_label.setText(self._lag_text())
+
+    def _lag_text(self) -> str:
+        lag = self._watchdog.lag
+        return f"Event loop lag: p50 {_milliseconds(lag.percentile(50))}, p99 {_milliseconds(lag.percentile(99))}, " \
+               f"max {_milliseconds(lag.max)} over {lag.count} probes, stall threshold {self._watchdog.threshold} ms"
+
+    @pyqtSlot(bool)
+    def _on_enabled_toggled(self, enabled: bool):
+        self._profiler.enabled = enabled
+
+    @pyqtSlot(bool)
+    def _on_watchdog_toggled(self, enabled: bool):
+        self._watchdog.enabled = enabled
+        self._query_monitor.enabled = enabled
+
+    @pyqtSlot()
+    def _on_clear_pressed(self):
+        self._profiler.clear()
+        self._watchdog.clear()
+        self._query_monitor.clear()
+        self._latency_model.refresh()
+        self._stall_model.refresh()
+        self._query_model.refresh()
+        self._lag_label.setText(self._lag_text())
+
+    @pyqtSlot()
+    def _on_dump_pressed(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save diagnostics", "diagnostics.json", "JSON (*.json)")
+        if path:
+            with open(path, 'w') as file:
+                json.dump({'callbacks': self._profiler.to_dict(), 'event_loop': self._watchdog.to_dict(),
+                           'gui_thread_queries': self._query_monitor.to_dict()}, file, indent=2)
+
+
+class DiagnosticsFactory(ABC):
+    @abstractmethod
+    def create(self) -> DiagnosticsWindow:
+        raise NotImplementedError
+
+
+class DiagnosticsFactoryImpl(DiagnosticsFactory):
+    def __init__(self, profiler: CallbackProfiler, watchdog: EventLoopWatchdog, query_monitor: QueryThreadMonitor):
+        self._profiler = profiler
+        self._watchdog = watchdog
+        self._query_monitor = query_monitor
+
+    def create(self) -> DiagnosticsWindow:
+        return DiagnosticsWindow(self._profiler, self._watchdog, self._query_monitor)
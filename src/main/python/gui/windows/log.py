@@ -1,29 +1,525 @@
 from abc import abstractmethod, ABC
+from datetime import datetime, timedelta
+from typing import Optional
 
-from PyQt5.QtWidgets import QAbstractItemView, QHBoxLayout, QTableView
+from PyQt5 import QtGui
+from PyQt5.QtCore import pyqtSlot, QAbstractItemModel, QAbstractTableModel, QDate, QModelIndex, QObject, Qt
+from PyQt5.QtWidgets import QAbstractItemView, QComboBox, QDateEdit, QHBoxLayout, QTableView, QTabWidget, \
+    QTreeView, QVBoxLayout, QWidget
 
-from gui.activity import ActivityTableModel
+import utils
+from db import ActivityFilter, WorkBreakActivityRepository
+from gui.activity import ActivityTableModel, DATE_FORMAT, HORIZONTAL_HEADER
+from gui.task import TaskListModel
+from gui.timeline import TimelineController, TimelineModel, TimelineView
 from gui.windows.mainwindow import AbstractWindow
 
+_NO_DATE = QDate(2000, 1, 1)
+
+
+def _display_values(row: tuple) -> tuple:
+    is_work, activity_id, date, duration, expected_duration, task_id = row
+    return "Work" if is_work else "Break", date.strftime(DATE_FORMAT), duration, expected_duration
+
+
+class LogTableModel(QAbstractTableModel):
+    """
+        Model of the log window.
+        Sorting and filtering is done by the database, the rows are fetched page by page while the view is scrolled.
+    """
+    PAGE_SIZE = 200
+
+    def __init__(self, activity_repository: WorkBreakActivityRepository, activity_model: ActivityTableModel,
+                 parent: QObject = None):
+        super().__init__(parent)
+        self._repository = activity_repository
+        self._filter = ActivityFilter()
+        self._sort_column = 1
+        self._descending = True
+        self._total = 0
+        self._rows = []
+        self._display = []
+        self._paused = False
+        self._stale = False
+
+        # the activity model is the one that writes new and finished activities
+        activity_model.rowsInserted.connect(self._on_activities_changed)
+        activity_model.dataChanged.connect(self._on_activities_changed)
+
+        self._load(self.PAGE_SIZE)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(HORIZONTAL_HEADER)
+
+    def data(self, index: QModelIndex, role: int = 0):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._display[index.row()][index.column()]
+
+        return None
+
+    def headerData(self, col: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return HORIZONTAL_HEADER[col]
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and len(self._rows) < self._total
+
+    def fetchMore(self, parent: QModelIndex):
+        if not self.canFetchMore(parent):
+            return
+
+        after = self._repository.activity_page_key(self._rows[-1], self._sort_column) if self._rows else None
+        page = self._repository.activity_page(self._filter, self._sort_column, self._descending, after,
+                                              self.PAGE_SIZE)
+        if not page:
+            self._total = len(self._rows)
+            return
+
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(page) - 1)
+        self._rows.extend(page)
+        self._display.extend(_display_values(row) for row in page)
+        self.endInsertRows()
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder):
+        descending = order == Qt.SortOrder.DescendingOrder
+        if column == self._sort_column and descending == self._descending:
+            return
+
+        self._sort_column = column
+        self._descending = descending
+        self._reload(self.PAGE_SIZE)
+
+    def set_filter(self, activity_filter: ActivityFilter):
+        self._filter = activity_filter
+        self._reload(self.PAGE_SIZE)
+
+    @property
+    def paused(self) -> bool:
+        """
+            A paused model doesn't query the changed activities, it catches up once it is resumed
+        """
+        return self._paused
+
+    @paused.setter
+    def paused(self, paused: bool):
+        self._paused = paused
+        if not paused and self._stale:
+            self.refresh()
+
+    @pyqtSlot()
+    def refresh(self):
+        # keep the rows the user already scrolled through
+        self._reload(max(self.PAGE_SIZE, len(self._rows)))
+
+    @pyqtSlot()
+    def _on_activities_changed(self):
+        if self._paused:
+            self._stale = True
+        else:
+            self.refresh()
+
+    def _reload(self, limit: int):
+        self.beginResetModel()
+        self._load(limit)
+        self.endResetModel()
+        self._stale = False
+
+    def _load(self, limit: int):
+        self._total = self._repository.activity_count(self._filter)
+        self._rows = self._repository.activity_page(self._filter, self._sort_column, self._descending, None, limit)
+        self._display = [_display_values(row) for row in self._rows]
+
+
+_ROOT, _YEAR, _WEEK, _DAY, _ACTIVITY = range(5)
+# strftime format grouping the children of a node by its level
+_GROUP_FORMATS = {_ROOT: '%Y', _YEAR: '%W', _WEEK: '%Y-%m-%d'}
+
+
+def _week_range(year: int, week: int) -> tuple:
+    # weeks as numbered by strftime('%W'): weeks start on monday, days before the first monday are week 0
+    first_day = datetime(year, 1, 1)
+    first_monday = first_day + timedelta(days=(7 - first_day.weekday()) % 7)
+    if week == 0:
+        return first_day, first_monday
+
+    start = first_monday + timedelta(weeks=week - 1)
+    return start, min(start + timedelta(weeks=1), datetime(year + 1, 1, 1))
+
+
+def _group_range(level: int, date: datetime) -> tuple:
+    # [start, end) of the year, week or day node containing the date
+    if level == _YEAR:
+        return datetime(date.year, 1, 1), datetime(date.year + 1, 1, 1)
+    if level == _WEEK:
+        return _week_range(date.year, int(date.strftime('%W')))
+
+    start = datetime(date.year, date.month, date.day)
+    return start, start + timedelta(days=1)
+
+
+class _HistoryNode:
+    __slots__ = ('parent', 'row', 'level', 'start', 'end', 'display', 'children', 'loaded', 'key')
+
+    def __init__(self, parent: Optional['_HistoryNode'], row: int, level: int, start: Optional[datetime],
+                 end: Optional[datetime], display: tuple, key=None):
+        self.parent = parent
+        self.row = row
+        self.level = level
+        self.start = start
+        self.end = end
+        self.display = display
+        self.children = []
+        self.loaded = level == _ACTIVITY
+        # identifies the node among its siblings, the start of a group or (is_work, id) of an activity
+        self.key = start if key is None else key
+
+
+class ActivityHistoryModel(QAbstractItemModel):
+    """
+        Tree model of the log window grouping the activities by year, week and day.
+        The totals of each group are computed by grouped queries and the children of a node are only
+        queried once the node is expanded.
+        A new or changed activity only updates the totals of its year, week and day and the activities of its day if
+        they are loaded, the expanded nodes stay as they are.
+    """
+    HEADER = ['Period', 'Work Sessions', 'Work Time', 'Break Time']
+
+    def __init__(self, activity_repository: WorkBreakActivityRepository, activity_model: ActivityTableModel,
+                 parent: QObject = None):
+        super().__init__(parent)
+        self._repository = activity_repository
+        self._activity_model = activity_model
+        self._root = _HistoryNode(None, 0, _ROOT, None, None, ())
+        self._root.children = self._load_children(self._root)
+        self._root.loaded = True
+        self._paused = False
+        # rows of the activity model changed while paused, the activity model only appends rows
+        self._changed_rows = set()
+
+        activity_model.rowsInserted.connect(self._on_activities_inserted)
+        activity_model.dataChanged.connect(self._on_activities_changed)
+
+    def _node(self, index: QModelIndex) -> _HistoryNode:
+        return index.internalPointer() if index.isValid() else self._root
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+
+        return self.createIndex(row, column, self._node(parent).children[row])
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+
+        node = index.internalPointer().parent
+        if node is self._root:
+            return QModelIndex()
+
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.column() > 0:
+            return 0
+
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.HEADER)
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        node = self._node(parent)
+        if not node.loaded:
+            return True
+
+        return len(node.children) > 0
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not self._node(parent).loaded
+
+    def fetchMore(self, parent: QModelIndex):
+        node = self._node(parent)
+        if node.loaded:
+            return
+
+        children = self._load_children(node)
+        node.loaded = True
+        if not children:
+            return
+
+        self.beginInsertRows(parent, 0, len(children) - 1)
+        node.children = children
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role: int = 0):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return index.internalPointer().display[index.column()]
+
+        return None
+
+    def headerData(self, col: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADER[col]
+        return None
+
+    @property
+    def paused(self) -> bool:
+        """
+            A paused model remembers the changed activities and updates their groups once it is resumed
+        """
+        return self._paused
+
+    @paused.setter
+    def paused(self, paused: bool):
+        self._paused = paused
+        if not paused:
+            changed_rows, self._changed_rows = self._changed_rows, set()
+            for row in sorted(changed_rows):
+                self._update_activity(row)
+
+    @pyqtSlot()
+    def refresh(self):
+        self.beginResetModel()
+        self._root.children = self._load_children(self._root)
+        self._changed_rows = set()
+        self.endResetModel()
+
+    @pyqtSlot(QModelIndex, int, int)
+    def _on_activities_inserted(self, parent: QModelIndex, first: int, last: int):
+        for row in range(first, last + 1):
+            self._update_activity(row)
+
+    @pyqtSlot(QModelIndex, QModelIndex)
+    def _on_activities_changed(self, top_left: QModelIndex, bottom_right: QModelIndex):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            self._update_activity(row)
+
+    def _update_activity(self, activity_row: int):
+        if self._paused:
+            self._changed_rows.add(activity_row)
+            return
+
+        date = self._activity_model.index(activity_row, 0).data(Qt.ItemDataRole.UserRole).date
+
+        node = self._root
+        while node.level < _DAY:
+            node = self._update_group(node, date)
+            if node is None or not node.loaded:
+                return
+
+        self._update_day(node)
+
+    def _update_group(self, parent: _HistoryNode, date: datetime) -> Optional[_HistoryNode]:
+        # re-queries the totals of the child of parent containing the date, inserts the child if it is new
+        start, end = _group_range(parent.level + 1, date)
+        totals = self._repository.activity_totals(_GROUP_FORMATS[parent.level], start, end)
+        if not totals:
+            return None
+
+        node = self._group_node(parent, 0, totals[0])
+        existing = next((child for child in parent.children if child.key == node.key), None)
+        if existing is not None:
+            existing.display = node.display
+            self._emit_node_changed(existing)
+            return existing
+
+        row = sum(1 for child in parent.children if child.start < node.start)
+        self._insert_node(parent, row, node)
+        return node
+
+    def _update_day(self, day: _HistoryNode):
+        rows = self._repository.activity_page(ActivityFilter(start=day.start, end=day.end), 1, False, None, None)
+        existing = {child.key: child for child in day.children}
+
+        # activities are never removed and keep their date, so the loaded ones stay in order
+        for row, activity in enumerate(rows):
+            node = self._activity_node(day, row, activity)
+            child = existing.get(node.key)
+            if child is None:
+                self._insert_node(day, row, node)
+            elif child.display != node.display:
+                child.display = node.display
+                self._emit_node_changed(child)
+
+    def _insert_node(self, parent: _HistoryNode, row: int, node: _HistoryNode):
+        parent_index = QModelIndex() if parent is self._root else self.createIndex(parent.row, 0, parent)
+        self.beginInsertRows(parent_index, row, row)
+        parent.children.insert(row, node)
+        for sibling_row in range(row, len(parent.children)):
+            parent.children[sibling_row].row = sibling_row
+        self.endInsertRows()
+
+    def _emit_node_changed(self, node: _HistoryNode):
+        self.dataChanged.emit(self.createIndex(node.row, 0, node),
+                              self.createIndex(node.row, self.columnCount() - 1, node), [])
+
+    def _load_children(self, node: _HistoryNode) -> list:
+        if node.level == _DAY:
+            rows = self._repository.activity_page(ActivityFilter(start=node.start, end=node.end), 1, False, None, None)
+            return [self._activity_node(node, row, activity) for row, activity in enumerate(rows)]
+
+        totals = self._repository.activity_totals(_GROUP_FORMATS[node.level], node.start, node.end)
+        return [self._group_node(node, row, total) for row, total in enumerate(totals)]
+
+    @staticmethod
+    def _group_node(parent: _HistoryNode, row: int, total: tuple) -> _HistoryNode:
+        group, work_count, work_seconds, break_count, break_seconds = total
+
+        if parent.level == _ROOT:
+            start, end = datetime(int(group), 1, 1), datetime(int(group) + 1, 1, 1)
+            label = group
+        elif parent.level == _YEAR:
+            start, end = _week_range(parent.start.year, int(group))
+            label = f"Week {int(group)} ({start.strftime('%d.%m.')} - {(end - timedelta(days=1)).strftime('%d.%m.')})"
+        else:
+            start = datetime.strptime(group, '%Y-%m-%d')
+            end = start + timedelta(days=1)
+            label = start.strftime('%a %d.%m.%y')
+
+        display = (label, work_count, utils.convert_seconds_to_hours_string(work_seconds),
+                   utils.convert_seconds_to_hours_string(break_seconds))
+        return _HistoryNode(parent, row, parent.level + 1, start, end, display)
+
+    @staticmethod
+    def _activity_node(parent: _HistoryNode, row: int, activity: tuple) -> _HistoryNode:
+        is_work, activity_id, date, duration, expected_duration, task_id = activity
+        duration = utils.convert_seconds_to_time_string(duration) if duration is not None else None
+
+        if is_work:
+            display = (f"Work {date.strftime('%H:%M:%S')}", None, duration, None)
+        else:
+            display = (f"Break {date.strftime('%H:%M:%S')}", None, None, duration)
+        return _HistoryNode(parent, row, _ACTIVITY, date, None, display, (bool(is_work), activity_id))
+
 
 class LogWindow(AbstractWindow):
     """
         Window displaying the latest activities
     """
-    def __init__(self, activity_model: ActivityTableModel):
+    def __init__(self, activity_repository: WorkBreakActivityRepository, activity_model: ActivityTableModel,
+                 task_model: TaskListModel):
         super(LogWindow, self).__init__()
 
-        layout = QHBoxLayout(self)
+        self._log_model = LogTableModel(activity_repository, activity_model, self)
+
+        self._type_select = QComboBox(self)
+        self._type_select.addItem("All", None)
+        self._type_select.addItem("Work", True)
+        self._type_select.addItem("Break", False)
+
+        self._start_select = self._create_date_select("From: any")
+        self._end_select = self._create_date_select("To: any")
+
+        self._task_model = task_model
+        self._task_select = QComboBox(self)
+        self._fill_task_select()
+
+        self._history_model = ActivityHistoryModel(activity_repository, activity_model, self)
 
         self.log_view = QTableView()
         self.log_view.verticalHeader().hide()
         self.log_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
-        self.log_view.setModel(activity_model)
+        self.log_view.setModel(self._log_model)
+        self.log_view.horizontalHeader().setSortIndicator(1, Qt.SortOrder.DescendingOrder)
+        self.log_view.setSortingEnabled(True)
+
+        self.history_view = QTreeView()
+        self.history_view.setUniformRowHeights(True)
+        self.history_view.setModel(self._history_model)
+
+        self._timeline_model = TimelineModel(activity_model, self)
+        self.timeline_view = TimelineView(TimelineController(self._timeline_model), self._timeline_model)
 
-        layout.addWidget(self.log_view)
+        self._type_select.currentIndexChanged.connect(self._on_filter_changed)
+        self._start_select.dateChanged.connect(self._on_filter_changed)
+        self._end_select.dateChanged.connect(self._on_filter_changed)
+        self._task_select.currentIndexChanged.connect(self._on_filter_changed)
+
+        log_tab = QWidget()
+        log_layout = QVBoxLayout(log_tab)
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self._type_select)
+        filter_layout.addWidget(self._start_select)
+        filter_layout.addWidget(self._end_select)
+        filter_layout.addWidget(self._task_select)
+        log_layout.addLayout(filter_layout)
+        log_layout.addWidget(self.log_view)
+
+        tabs = QTabWidget(self)
+        tabs.addTab(log_tab, "Activities")
+        tabs.addTab(self.history_view, "History")
+        tabs.addTab(self.timeline_view, "Timeline")
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(tabs)
 
         self._center()
 
+    def reopen(self):
+        # tasks may have been added or deleted meanwhile, a deleted selected task resets the filter
+        self._fill_task_select()
+        self._log_model.paused = False
+        self._history_model.paused = False
+        self._timeline_model.paused = False
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        # a closed window kept by the window pool doesn't query the activities until it is reopened
+        self._log_model.paused = True
+        self._history_model.paused = True
+        self._timeline_model.paused = True
+        super().closeEvent(event)
+
+    def _fill_task_select(self):
+        selected_task_id = self._task_select.currentData()
+
+        self._task_select.blockSignals(True)
+        self._task_select.clear()
+        self._task_select.addItem("All tasks", None)
+        for row in range(1, self._task_model.rowCount()):
+            task = self._task_model.index(row).data(Qt.ItemDataRole.UserRole)
+            self._task_select.addItem(task.name, task.id)
+        self._task_select.setCurrentIndex(max(self._task_select.findData(selected_task_id), 0))
+        self._task_select.blockSignals(False)
+
+        if self._task_select.currentData() != selected_task_id:
+            self._on_filter_changed()
+
+    def _create_date_select(self, no_date_text: str) -> QDateEdit:
+        # the minimum date is displayed as no_date_text and means that the date range is open
+        date_select = QDateEdit(self)
+        date_select.setCalendarPopup(True)
+        date_select.setMinimumDate(_NO_DATE)
+        date_select.setSpecialValueText(no_date_text)
+        date_select.setDate(_NO_DATE)
+        return date_select
+
+    @staticmethod
+    def _selected_date(date_select: QDateEdit) -> Optional[datetime]:
+        date = date_select.date()
+        if date == _NO_DATE:
+            return None
+
+        return datetime(date.year(), date.month(), date.day())
+
+    @pyqtSlot()
+    def _on_filter_changed(self):
+        start = self._selected_date(self._start_select)
+        end = self._selected_date(self._end_select)
+
+        self._log_model.set_filter(ActivityFilter(
+            work=self._type_select.currentData(),
+            start=start,
+            end=end + timedelta(days=1) if end else None,
+            task_id=self._task_select.currentData()
+        ))
+
 
 class LogFactory(ABC):
     @abstractmethod
@@ -32,8 +528,11 @@ class LogFactory(ABC):
 
 
 class LogFactoryImpl(LogFactory):
-    def __init__(self, activity_model: ActivityTableModel):
+    def __init__(self, activity_repository: WorkBreakActivityRepository, activity_model: ActivityTableModel,
+                 task_model: TaskListModel):
+        self._activity_repository = activity_repository
         self._activity_model = activity_model
+        self._task_model = task_model
 
     def create(self) -> LogWindow:
-        return LogWindow(self._activity_model)
+        return LogWindow(self._activity_repository, self._activity_model, self._task_model)
@@ -1,6 +1,5 @@
 from PyQt5 import QtGui
 from PyQt5.QtCore import pyqtSignal
-from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QWidget
 
 import utils
@@ -15,7 +14,7 @@ class AbstractWindow(QWidget):
     def __init__(self):
         super(AbstractWindow, self).__init__()
         self.setWindowTitle("Work Split Tracker")
-        self.setWindowIcon(QIcon(utils.resource_provider.image("tray_icon.png")))
+        self.setWindowIcon(utils.resource_provider.icon("tray_icon.png"))
 
     def _center(self):
         frameGm = self.frameGeometry()
@@ -23,6 +22,18 @@ class AbstractWindow(QWidget):
         frameGm.moveCenter(centerPoint)
         self.move(frameGm.topLeft())
 
+    def reopen(self):
+        """
+            Called before a hidden window of the window pool is shown again
+        """
+        pass
+
+    def release(self):
+        """
+            Called when the window pool discards the window
+        """
+        pass
+
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:
         self.about_to_close.emit()
         super().closeEvent(event)
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QTimer
+
+from gui.windows.mainwindow import AbstractWindow
+
+
+class WindowPool(QObject):
+    """
+        Keeps closed windows hidden instead of building them again on every open.
+        Windows are created by their factory and pooled by it, so every factory has at most one window. At most
+        capacity windows are kept, when a new one exceeds it the least recently used hidden windows are released.
+        Hidden windows are also released after the idle timeout. Qt5 doesn't report memory pressure, so the bound and
+        the timeout are the only reasons to release a window.
+    """
+    def __init__(self, capacity: int, idle_timeout: int, parent: QObject = None):
+        super(WindowPool, self).__init__(parent)
+
+        self._capacity = capacity
+        self._idle_timeout = idle_timeout * 1000
+        # factory -> window, least recently opened first
+        self._windows = OrderedDict()
+        self._idle_timers = {}
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def __contains__(self, factory) -> bool:
+        return factory in self._windows
+
+    def open(self, factory) -> AbstractWindow:
+        window = self._windows.get(factory)
+        if window is None:
+            window = factory.create()
+            window.about_to_close.connect(lambda: self._on_window_closed(factory))
+            self._windows[factory] = window
+        else:
+            self._stop_idle_timer(factory)
+            if window.isHidden():
+                window.reopen()
+
+        self._windows.move_to_end(factory)
+        self._release_least_recently_used()
+
+        window.show()
+        window.raise_()
+        window.activateWindow()
+        return window
+
+    def release(self, factory):
+        self._stop_idle_timer(factory)
+        window = self._windows.pop(factory, None)
+        if window is None:
+            return
+
+        window.release()
+        window.deleteLater()
+
+    def release_all(self):
+        for factory in list(self._windows):
+            self.release(factory)
+
+    def _on_window_closed(self, factory):
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(self._idle_timeout)
+        timer.timeout.connect(lambda: self.release(factory))
+        timer.start()
+
+        self._stop_idle_timer(factory)
+        self._idle_timers[factory] = timer
+
+    def _stop_idle_timer(self, factory):
+        timer = self._idle_timers.pop(factory, None)
+        if timer is not None:
+            timer.stop()
+            timer.deleteLater()
+
+    def _release_least_recently_used(self):
+        excess = len(self._windows) - self._capacity
+        if excess <= 0:
+            return
+
+        # windows that are shown are never released
+        hidden = [factory for factory, window in self._windows.items() if window.isHidden()]
+        for factory in hidden[:excess]:
+            self.release(factory)
@@ -90,9 +90,9 @@ class SettingsController(QObject):
 
         self._model = model
         self._notifier = notifier
-        self._init_settings()
+        self.load_settings()
         
-    def _init_settings(self):
+    def load_settings(self):
         self._model.work_time = self._notifier.work_time
         self._model.break_time = self._notifier.break_time
         self._model.show_notification = self._notifier.show_notification
@@ -224,6 +224,10 @@ class SettingsWindow(AbstractWindow):
 
         self._center()
 
+    def reopen(self):
+        # discard unsaved changes of the last time the window was open
+        self._controller.load_settings()
+
 
 class SettingsFactory(ABC):
     @abstractmethod
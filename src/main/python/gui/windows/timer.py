@@ -1,31 +1,20 @@
 from abc import ABC, abstractmethod
 
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, QModelIndex, QObject, QSortFilterProxyModel, Qt
+from PyQt5 import QtGui
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QModelIndex, QObject, Qt
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QComboBox, QHBoxLayout, QLabel, QPushButton, QVBoxLayout, QWidget
+from PyQt5.QtWidgets import QComboBox, QHBoxLayout, QLabel, QLineEdit, QPushButton, QVBoxLayout, QWidget
 
 import utils
 from application.app import WorkSplitTracker, WSTContext, WSTState
-from application.models import Task
+from application.records import TaskRecord
 from application.timer import CountdownTimerContext, PriorityCallback, WSTCountdownTimerIdentifier
 from application.timer import CountdownTimerController as WSTCountdownTimerController
 from gui.dialogs.task import TaskCompletedDialogFactory
-from gui.task import TaskListModel
+from gui.task import TaskListModel, TaskSearchModel
 from gui.windows.mainwindow import AbstractWindow
 
 
-class CountdownTimerTaskProxyModel(QSortFilterProxyModel):
-    """
-       Proxy Model used to display, sort and select the tasks provided by the TaskListModel
-   """
-    def __init__(self):
-        super().__init__()
-
-    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
-        data = self.sourceModel().index(source_row, 0, source_parent).data(Qt.ItemDataRole.UserRole)
-        return not data.completed
-
-
 class CountdownTimerModel(QObject):
     """
         Model of the timer window
@@ -36,7 +25,7 @@ class CountdownTimerModel(QObject):
     label_changed = pyqtSignal(str)
     time_changed = pyqtSignal(str)
     time_color_changed = pyqtSignal(str)
-    selected_index_changed = pyqtSignal(int)
+    selected_task_changed = pyqtSignal(TaskRecord)
     task_select_enabled_changed = pyqtSignal(bool)
 
     def __init__(self, task_model: TaskListModel, task_completed_dialog_factory: TaskCompletedDialogFactory):
@@ -45,9 +34,9 @@ class CountdownTimerModel(QObject):
         self._task_model = task_model
         self._task_completed_dialog_factory = task_completed_dialog_factory
 
-        self._work_icon = QIcon(utils.resource_provider.image("211876_play_icon.png"))
-        self._break_icon = QIcon(utils.resource_provider.image("211871_pause_icon.png"))
-        self._idle_icon = QIcon(utils.resource_provider.image("211931_stop_icon.png"))
+        self._work_icon = utils.resource_provider.icon("211876_play_icon.png")
+        self._break_icon = utils.resource_provider.icon("211871_pause_icon.png")
+        self._idle_icon = utils.resource_provider.icon("211931_stop_icon.png")
 
         self._work_button_hidden = False
         self._break_button_hidden = True
@@ -55,14 +44,11 @@ class CountdownTimerModel(QObject):
         self._label = "Timer"
         self._time = "-"
         self._time_color = "black"
-        self._selected_index = 0
+        self._selected_task = task_model.DEFAULT
         self._task_select_enabled = True
 
-        self._proxy_task_model = CountdownTimerTaskProxyModel()
-        self._proxy_task_model.setSourceModel(self._task_model)
-        self._proxy_task_model.setSortRole(self._task_model.SORT_PRIORITY_ROLE)
-        self._proxy_task_model.setDynamicSortFilter(True)
-        self._proxy_task_model.sort(0, Qt.SortOrder.DescendingOrder)
+        self._search_model = TaskSearchModel(task_model, parent=self)
+        self._search_model.pinned = self._selected_task
 
     @property
     def work_icon(self) -> QIcon:
@@ -131,13 +117,15 @@ class CountdownTimerModel(QObject):
         self.time_color_changed.emit(color)
 
     @property
-    def selected_index(self) -> int:
-        return self._selected_index
+    def selected_task(self) -> TaskRecord:
+        return self._selected_task
 
-    @selected_index.setter
-    def selected_index(self, index: int):
-        self._selected_index = index
-        self.selected_index_changed.emit(index)
+    @selected_task.setter
+    def selected_task(self, task: TaskRecord):
+        self._selected_task = task
+        # the selected task stays in the combo box when the query doesn't match it
+        self._search_model.pinned = task
+        self.selected_task_changed.emit(task)
 
     @property
     def task_select_enabled(self) -> bool:
@@ -149,14 +137,18 @@ class CountdownTimerModel(QObject):
         self.task_select_enabled_changed.emit(enabled)
 
     @property
-    def proxy_model(self) -> QSortFilterProxyModel:
-        return self._proxy_task_model
+    def search_placeholder(self) -> str:
+        return "Search tasks"
+
+    @property
+    def search_model(self) -> TaskSearchModel:
+        return self._search_model
 
     @property
     def task_model(self) -> TaskListModel:
         return self._task_model
 
-    def open_task_completed_dialog(self, index: QModelIndex, task: Task):
+    def open_task_completed_dialog(self, index: QModelIndex, task: TaskRecord):
         dialog = self._task_completed_dialog_factory.create(task.name)
         if dialog.exec():
             task.completed = True
@@ -174,65 +166,61 @@ class CountdownTimerController(QObject):
         self._wst_timer_controller = wst_timer_controller
         self._model = model
 
-        # before state change callbacks
-        self._wst.context.push_before_state_change_callback(WSTState.WORK, PriorityCallback(self._after_work, 3))
-
-        # after state change callbacks
-        self._wst.context.push_after_state_change_callback(WSTState.WORK, PriorityCallback(self._before_work, 3))
-        self._wst.context.push_after_state_change_callback(WSTState.BREAK, PriorityCallback(self._before_break, 3))
-        self._wst.context.push_after_state_change_callback(WSTState.IDLE, PriorityCallback(self._before_idle, 3))
-
-        # timer tick callbacks
-        self._wst_timer_controller.timer_context.push_tick_identifier_callback(
-            WSTCountdownTimerIdentifier.WORK,
-            PriorityCallback(self._on_timer_tick, 3)
-        )
-        self._wst_timer_controller.timer_context.push_tick_identifier_callback(
-            WSTCountdownTimerIdentifier.BREAK,
-            PriorityCallback(self._on_timer_tick, 3)
-        )
-
-        # timer alarm callbacks
-        self._wst_timer_controller.timer_context.push_alarm_identifier_callback(
-            WSTCountdownTimerIdentifier.WORK,
-            PriorityCallback(self._on_timer_alarm, 3)
-        )
-        self._wst_timer_controller.timer_context.push_alarm_identifier_callback(
-            WSTCountdownTimerIdentifier.BREAK,
-            PriorityCallback(self._on_timer_alarm, 3)
-        )
+        self._callback_handles = []
+
+        open_tasks = self._model.task_model.open_tasks_by_priority
+        open_tasks.rowsRemoved.connect(self._on_open_tasks_removed)
+        open_tasks.modelReset.connect(self._on_open_tasks_removed)
 
+        self.add_callbacks()
         self._init_model(self._wst.context)
 
+    def add_callbacks(self):
+        if self._callback_handles:
+            return
+
+        timer_context = self._wst_timer_controller.timer_context
+        self._callback_handles = [
+            # before state change callbacks
+            self._wst.context.push_before_state_change_callback(WSTState.WORK, PriorityCallback(self._after_work, 3)),
+
+            # after state change callbacks
+            self._wst.context.push_after_state_change_callback(WSTState.WORK, PriorityCallback(self._before_work, 3)),
+            self._wst.context.push_after_state_change_callback(WSTState.BREAK, PriorityCallback(self._before_break, 3)),
+            self._wst.context.push_after_state_change_callback(WSTState.IDLE, PriorityCallback(self._before_idle, 3)),
+
+            # timer tick callbacks
+            timer_context.push_tick_identifier_callback(WSTCountdownTimerIdentifier.WORK,
+                                                        PriorityCallback(self._on_timer_tick, 3)),
+            timer_context.push_tick_identifier_callback(WSTCountdownTimerIdentifier.BREAK,
+                                                        PriorityCallback(self._on_timer_tick, 3)),
+
+            # timer alarm callbacks
+            timer_context.push_alarm_identifier_callback(WSTCountdownTimerIdentifier.WORK,
+                                                         PriorityCallback(self._on_timer_alarm, 3)),
+            timer_context.push_alarm_identifier_callback(WSTCountdownTimerIdentifier.BREAK,
+                                                         PriorityCallback(self._on_timer_alarm, 3))
+        ]
+
     def remove_callbacks(self):
-        self._wst.context.remove_before_state_change_callback(WSTState.WORK, PriorityCallback(self._after_work, 3))
-        self._wst.context.remove_after_state_change_callback(WSTState.WORK, PriorityCallback(self._before_work, 3))
-        self._wst.context.remove_after_state_change_callback(WSTState.BREAK, PriorityCallback(self._before_break, 3))
-        self._wst.context.remove_after_state_change_callback(WSTState.IDLE, PriorityCallback(self._before_idle, 3))
-        self._wst_timer_controller.timer_context.remove_tick_identifier_callback(
-            WSTCountdownTimerIdentifier.WORK,
-            PriorityCallback(self._on_timer_tick, 3)
-        )
-        self._wst_timer_controller.timer_context.remove_tick_identifier_callback(
-            WSTCountdownTimerIdentifier.BREAK,
-            PriorityCallback(self._on_timer_tick, 3)
-        )
-        self._wst_timer_controller.timer_context.remove_alarm_identifier_callback(
-            WSTCountdownTimerIdentifier.WORK,
-            PriorityCallback(self._on_timer_alarm, 3)
-        )
-        self._wst_timer_controller.timer_context.remove_alarm_identifier_callback(
-            WSTCountdownTimerIdentifier.BREAK,
-            PriorityCallback(self._on_timer_alarm, 3)
-        )
+        for handle in self._callback_handles:
+            handle.remove()
+        self._callback_handles = []
+
+    def resume(self):
+        """
+            Subscribes again and catches up with the state changes missed while the window was closed
+        """
+        self.add_callbacks()
+        self._init_model(self._wst.context)
+        # a session that ended while the window was closed left the task select disabled
+        if self._wst.context.state != WSTState.WORK and not self._model.task_select_enabled:
+            self._reset_task_select()
 
     @pyqtSlot()
     def on_work_button_pressed(self):
-        if self._model.selected_index == 0:
-            self._wst.do_work(None)
-        else:
-            self._wst.do_work(self._model.proxy_model.index(
-                self._model.selected_index, 0).data(Qt.ItemDataRole.UserRole))
+        task = self._model.selected_task
+        self._wst.do_work(None if task is self._model.task_model.DEFAULT else task)
 
     @pyqtSlot()
     def on_break_button_pressed(self):
@@ -243,8 +231,23 @@ class CountdownTimerController(QObject):
         self._wst.do_idle()
 
     @pyqtSlot(int)
-    def on_selection_changed(self, index: int):
-        self._model.selected_index = index
+    def on_task_activated(self, row: int):
+        self._model.selected_task = self._model.search_model.task(row)
+
+    @pyqtSlot(str)
+    def on_search_changed(self, query: str):
+        self._model.search_model.set_query(query)
+        search_model = self._model.search_model
+        # type-ahead: the best match is selected right away
+        self._model.selected_task = search_model.task(0) if search_model.match_count else self._model.task_model.DEFAULT
+
+    @pyqtSlot()
+    def _on_open_tasks_removed(self):
+        # a task completed or deleted elsewhere can't be worked on anymore
+        task_model = self._model.task_model
+        task = self._model.selected_task
+        if task is not task_model.DEFAULT and not task_model.open_tasks_by_priority.index_of(task).isValid():
+            self._model.selected_task = task_model.DEFAULT
 
     def _before_work(self, context: WSTContext):
         self._model.work_button_hidden = True
@@ -256,12 +259,15 @@ class CountdownTimerController(QObject):
         self._model.task_select_enabled = False
 
     def _after_work(self, context: WSTContext):
-        index = self._model.proxy_model.mapToSource(self._model.proxy_model.index(self._model.selected_index, 0))
         task = context.task
         if task:
+            index = self._model.task_model.index_of(task)
             self._increment_task_workload(index=index, task=task)
             self._model.open_task_completed_dialog(index=index, task=task)
-        self._model.selected_index = 0
+        self._reset_task_select()
+
+    def _reset_task_select(self):
+        self._model.selected_task = self._model.task_model.DEFAULT
         self._model.task_select_enabled = True
 
     def _before_break(self, context: WSTContext):
@@ -294,7 +300,7 @@ class CountdownTimerController(QObject):
         elif context.state == WSTState.IDLE:
             self._before_idle(context)
 
-    def _increment_task_workload(self, index: QModelIndex, task: Task):
+    def _increment_task_workload(self, index: QModelIndex, task: TaskRecord):
         task.completed_workload = task.completed_workload + 1
         self._model.task_model.setData(index, task)
 
@@ -313,6 +319,7 @@ class CountdownTimerView(QWidget):
         self._work_button = QPushButton(icon=self._model.work_icon, parent=self)
         self._break_button = QPushButton(icon=self._model.break_icon, parent=self)
         self._idle_button = QPushButton(icon=self._model.idle_icon, parent=self)
+        self._search = QLineEdit(parent=self)
         self._work_select = QComboBox(parent=self)
 
         self._init_state()
@@ -323,7 +330,12 @@ class CountdownTimerView(QWidget):
         self._work_button.setHidden(self._model.work_button_hidden)
         self._break_button.setHidden(self._model.break_button_hidden)
         self._idle_button.setEnabled(self._model.idle_button_enabled)
-        self._work_select.setModel(self._model.proxy_model)
+        self._search.setPlaceholderText(self._model.search_placeholder)
+        self._search.setClearButtonEnabled(True)
+        self._search.setEnabled(self._model.task_select_enabled)
+        self._work_select.setModel(self._model.search_model)
+        self._work_select.setCurrentIndex(self._model.search_model.row_of(self._model.selected_task))
+        self._work_select.setEnabled(self._model.task_select_enabled)
         self._time.setStyleSheet(f"color: {self._model.time_color}")
 
         self._label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -336,12 +348,15 @@ class CountdownTimerView(QWidget):
         self._model.label_changed.connect(self._on_label_changed)
         self._model.time_changed.connect(self._on_time_changed)
         self._model.time_color_changed.connect(self._on_time_color_changed)
-        self._model.selected_index_changed.connect(self._on_selected_index_changed)
+        self._model.selected_task_changed.connect(self._on_selected_task_changed)
+        self._model.task_select_enabled_changed.connect(self._on_task_select_enabled_changed)
+        self._model.search_model.modelReset.connect(self._on_search_model_reset)
 
         self._work_button.pressed.connect(self._controller.on_work_button_pressed)
         self._break_button.pressed.connect(self._controller.on_break_button_pressed)
         self._idle_button.pressed.connect(self._controller.on_idle_button_pressed)
-        self._work_select.currentIndexChanged.connect(self._controller.on_selection_changed)
+        self._work_select.activated.connect(self._controller.on_task_activated)
+        self._search.textEdited.connect(self._controller.on_search_changed)
 
     def _init_layout(self):
         main_layout = QVBoxLayout(self)
@@ -354,6 +369,7 @@ class CountdownTimerView(QWidget):
         main_layout.addWidget(self._label)
         main_layout.addWidget(self._time)
         main_layout.addLayout(button_layout)
+        main_layout.addWidget(self._search)
         main_layout.addWidget(self._work_select)
 
     @pyqtSlot(bool)
@@ -380,9 +396,18 @@ class CountdownTimerView(QWidget):
     def _on_time_color_changed(self, color: str):
         self._time.setStyleSheet(f"color: {color}")
 
-    @pyqtSlot(int)
-    def _on_selected_index_changed(self, index: int):
-        self._work_select.setCurrentIndex(index)
+    @pyqtSlot(TaskRecord)
+    def _on_selected_task_changed(self, task: TaskRecord):
+        self._work_select.setCurrentIndex(self._model.search_model.row_of(task))
+
+    @pyqtSlot()
+    def _on_search_model_reset(self):
+        self._work_select.setCurrentIndex(self._model.search_model.row_of(self._model.selected_task))
+
+    @pyqtSlot(bool)
+    def _on_task_select_enabled_changed(self, enabled: bool):
+        self._search.setEnabled(enabled)
+        self._work_select.setEnabled(enabled)
 
 
 class CountdownTimerWindow(AbstractWindow):
@@ -409,6 +434,19 @@ class CountdownTimerWindow(AbstractWindow):
     def clean_up(self):
         self._controller.remove_callbacks()
 
+    def reopen(self):
+        self._model.search_model.paused = False
+        self._controller.resume()
+
+    def release(self):
+        self.clean_up()
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        # a closed window kept by the window pool must not update its tasks or open dialogs
+        self.clean_up()
+        self._model.search_model.paused = True
+        super().closeEvent(event)
+
 
 class CountdownTimerFactory(ABC):
     @abstractmethod
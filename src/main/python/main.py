@@ -1,62 +1,113 @@
+import logging
+import multiprocessing
 import sys
+from typing import Callable
 
 from fbs_runtime.application_context.PyQt5 import ApplicationContext
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QMessageBox
 
 import utils
-from application.app import WorkSplitTracker, WSTContext
-from application.settings import SettingsNotifier
-from application.timer import CountdownTimerContext, CountdownTimerController
-from db import SettingsRepositoryImpl, SQLiteSessionManager, TaskRepositoryImpl, WorkBreakActivityRepository
+from application.diagnostics import CallbackProfiler
+from application.effects import EffectExecutor
+from application.engine import Engine
+from application.notification import PlyerNotifier
+from application.sound import PlaysoundPlayer, SoundPlayer
+from db import QueryThreadMonitor, SettingsRepositoryImpl, SQLiteSessionManager, TaskRepositoryImpl, \
+    WorkBreakActivityRepository
 from gui.activity import ActivityTableModel
 from gui.dialogs.confirm import ConfirmDialogFactoryImpl
-from gui.dialogs.task import CreateEditTaskDialogFactoryImpl, TaskCompletedDialogFactoryImpl
+from gui.dialogs.task import CreateEditTaskDialogFactoryImpl, PriorityDialogFactoryImpl, TaskCompletedDialogFactoryImpl
 from gui.task import TaskListModel
+from gui.timer import QTimerAdapter
 from gui.tray import Tray
+from gui.watchdog import EventLoopWatchdog
 from gui.windows.analytics import AnalyticsFactoryImpl
 from gui.windows.backlog import BacklogFactoryImpl
+from gui.windows.diagnostics import DiagnosticsFactoryImpl
 from gui.windows.log import LogFactoryImpl
+from gui.windows.pool import WindowPool
 from gui.windows.settings import SettingsFactoryImpl
 from gui.windows.timer import CountdownTimerFactoryImpl
 
+# icons of the timer and backlog window
+_WINDOW_IMAGES = ("211876_play_icon.png", "211871_pause_icon.png", "211931_stop_icon.png", "211878_plus_icon.png",
+                  "211864_minus_icon.png", "211643_checkmark_round_icon.png")
+
+
+def _create_sound_player(backend: str, effect_executor: EffectExecutor,
+                         sound_path: Callable[[str], str]) -> SoundPlayer:
+    if backend == "qsoundeffect":
+        try:
+            # QtMultimedia depends on the system audio libraries, e.g. PulseAudio on Linux
+            from gui.sound import QSoundEffectPlayer
+        except ImportError:
+            logging.getLogger(__name__).warning("QtMultimedia not available, falling back to playsound", exc_info=True)
+        else:
+            return QSoundEffectPlayer(sound_path, preload=("notification.wav",))
+
+    return PlaysoundPlayer(effect_executor, sound_path)
+
 
 def main():
     app_context = ApplicationContext()
     app = app_context.app
     app.setQuitOnLastWindowClosed(False)
     utils.resource_provider = utils.ResourceProvider(app_context)
+    # the tray icon is needed right away, the icons of the windows are decoded once the event loop is running
+    utils.resource_provider.prewarm(images=("tray_icon.png",), sounds=("notification.wav",))
+    QTimer.singleShot(0, lambda: utils.resource_provider.prewarm(images=_WINDOW_IMAGES))
 
     if not Tray.isSystemTrayAvailable():
         QMessageBox.critical(None, "System Tray", "System tray was not detected!")
         sys.exit(1)
 
     # DB Access
-    session_manager = SQLiteSessionManager()
+    session_manager = SQLiteSessionManager(in_memory=app_context.build_settings['in_memory_db'])
+    app.aboutToQuit.connect(session_manager.close)
+    if session_manager.in_memory:
+        persist_timer = QTimerAdapter(interval=app_context.build_settings['db_persist_interval'] * 1000)
+        persist_timer.task = session_manager.persist
+        persist_timer.start()
     settings_repository = SettingsRepositoryImpl(session_manager)
     task_repository = TaskRepositoryImpl(session_manager)
     activity_repository = WorkBreakActivityRepository(session_manager)
 
     # Application
-    settings_notifier = SettingsNotifier(settings_repository)
-    wst_context = WSTContext()
-    timer_context = CountdownTimerContext()
-    wst_timer_controller = CountdownTimerController(wst_context=wst_context, timer_context=timer_context,
-                                                    settings_notifier=settings_notifier)
-    wst = WorkSplitTracker(wst_context)
+    effect_executor = EffectExecutor()
+    app.aboutToQuit.connect(effect_executor.shutdown)
+    engine = Engine(settings_repository, timer_factory=QTimerAdapter,
+                    notifier=PlyerNotifier(effect_executor, utils.resource_provider.image),
+                    sound_player=_create_sound_player(app_context.build_settings['sound_backend'], effect_executor,
+                                                       utils.resource_provider.sound))
+    settings_notifier = engine.settings_notifier
+    wst_timer_controller = engine.wst_timer_controller
+    wst = engine.wst
+    profiler = CallbackProfiler([engine.wst_context, engine.timer_context],
+                                enabled=app_context.build_settings['callback_profiling'])
+    watchdog = EventLoopWatchdog(threshold=app_context.build_settings['stall_threshold'], parent=app)
+    query_monitor = QueryThreadMonitor(session_manager.engine)
+    watchdog.enabled = query_monitor.enabled = app_context.build_settings['event_loop_watchdog']
 
     # GUI
     task_model = TaskListModel(task_repository)
     activity_model = ActivityTableModel(activity_repository)
+    activity_model.work_activity_updated.connect(task_model.on_work_activity_updated)
     create_edit_task_dialog_factory = CreateEditTaskDialogFactoryImpl()
     confirm_dialog_factory = ConfirmDialogFactoryImpl()
     task_completed_dialog_factory = TaskCompletedDialogFactoryImpl()
+    priority_dialog_factory = PriorityDialogFactoryImpl()
     timer_factory = CountdownTimerFactoryImpl(wst=wst, wst_timer_controller=wst_timer_controller,
                                               task_model=task_model,
                                               task_completed_dialog_factory=task_completed_dialog_factory)
-    backlog_factory = BacklogFactoryImpl(create_edit_task_dialog_factory, confirm_dialog_factory, task_model)
+    backlog_factory = BacklogFactoryImpl(create_edit_task_dialog_factory, confirm_dialog_factory,
+                                         priority_dialog_factory, task_model)
     analytics_factory = AnalyticsFactoryImpl(task_model, activity_model)
-    log_factory = LogFactoryImpl(activity_model)
+    log_factory = LogFactoryImpl(activity_repository, activity_model, task_model)
     settings_factory = SettingsFactoryImpl(settings_notifier)
+    diagnostics_factory = DiagnosticsFactoryImpl(profiler, watchdog, query_monitor)
+    window_pool = WindowPool(capacity=app_context.build_settings['window_pool_size'],
+                             idle_timeout=app_context.build_settings['window_idle_timeout'])
     tray = Tray(
         app=app,
         wst=wst,
@@ -67,7 +118,9 @@ def main():
         backlog_factory=backlog_factory,
         analytics_factory=analytics_factory,
         log_factory=log_factory,
-        settings_factory=settings_factory
+        settings_factory=settings_factory,
+        diagnostics_factory=diagnostics_factory,
+        window_pool=window_pool
     )
 
     tray.show()
@@ -75,4 +128,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # the sounds are played by child processes, which start the frozen executable again
+    multiprocessing.freeze_support()
     main()
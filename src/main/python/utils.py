@@ -1,15 +1,62 @@
 from fbs_runtime.application_context.PyQt5 import ApplicationContext
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtGui import QIcon, QImageReader, QPixmap
+
+# the bundled icons are up to 4096px, they are decoded at most at this size which still covers high DPI screens
+_MAX_IMAGE_SIZE = QSize(256, 256)
 
 
 class ResourceProvider:
+    """
+        Resolves the paths of the bundled resources and shares the decoded images.
+        Paths are resolved once and every image is decoded once per process and at a bounded size, the windows get
+        the same QIcon and QPixmap instances each time they are created.
+    """
     def __init__(self, context: ApplicationContext):
         self._context = context
+        self._paths = {}
+        self._pixmaps = {}
+        self._icons = {}
+
+    def image(self, file_name: str) -> str:
+        return self._path(f"img/{file_name}")
+
+    def sound(self, file_name: str) -> str:
+        return self._path(f"sound/{file_name}")
 
-    def image(self, file_name: str):
-        return self._context.get_resource(f"img/{file_name}")
+    def pixmap(self, file_name: str) -> QPixmap:
+        pixmap = self._pixmaps.get(file_name)
+        if pixmap is None:
+            reader = QImageReader(self.image(file_name))
+            size = reader.size()
+            if size.width() > _MAX_IMAGE_SIZE.width() or size.height() > _MAX_IMAGE_SIZE.height():
+                reader.setScaledSize(size.scaled(_MAX_IMAGE_SIZE, Qt.AspectRatioMode.KeepAspectRatio))
+            pixmap = QPixmap.fromImage(reader.read())
+            self._pixmaps[file_name] = pixmap
+        return pixmap
 
-    def sound(self, file_name):
-        return self._context.get_resource(f"sound/{file_name}")
+    def icon(self, file_name: str) -> QIcon:
+        icon = self._icons.get(file_name)
+        if icon is None:
+            icon = QIcon(self.pixmap(file_name))
+            self._icons[file_name] = icon
+        return icon
+
+    def prewarm(self, images=(), sounds=()):
+        """
+            Decodes the images and resolves the sound paths ahead of their first use
+        """
+        for file_name in images:
+            self.icon(file_name)
+        for file_name in sounds:
+            self.sound(file_name)
+
+    def _path(self, resource: str) -> str:
+        path = self._paths.get(resource)
+        if path is None:
+            path = self._context.get_resource(resource)
+            self._paths[resource] = path
+        return path
 
 
 resource_provider: ResourceProvider
@@ -24,3 +71,7 @@ def convert_seconds_to_time_string(seconds: int):
     minutes, seconds = divmod(abs(seconds), 60)
     return '{}{:02d}:{:02d}'.format(prefix, minutes, seconds)
 
+
+def convert_seconds_to_hours_string(seconds: int):
+    hours, minutes = divmod(seconds // 60, 60)
+    return '{}h {:02d}m'.format(hours, minutes)